@@ -1,19 +1,410 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, Response, stream_with_context, g, has_request_context, abort
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session as BaseSession
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import make_transient_to_detached
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from werkzeug.utils import safe_join
+from collections import OrderedDict, deque, namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, date, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+import base64
+import calendar
+import csv
+import gzip
+import hashlib
+import hmac
+import io
+import itertools
+import json
+import logging
+import mimetypes
 import os
+import re
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = Flask(__name__)
+# Static files are served by static_file() below, which adds compression and fingerprints
+app = Flask(__name__, static_folder=None)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///money_tracker.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['DEFAULT_CURRENCY'] = os.environ.get('DEFAULT_CURRENCY', 'USD')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_pre_ping': True,
+    'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+}
+if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'].update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    })
+# Stats response cache: in-process LRU by default, or a Redis-compatible server URL
+app.config['STATS_CACHE_URL'] = os.environ.get('STATS_CACHE_URL')
+app.config['STATS_CACHE_MAX_ENTRIES'] = int(os.environ.get('STATS_CACHE_MAX_ENTRIES', 4096))
+# Instrumentation: /metrics is disabled unless a bearer token is configured
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 200))
+app.config['TRENDS_CACHE_MAX_USERS'] = int(os.environ.get('TRENDS_CACHE_MAX_USERS', 512))
+app.config['RULES_CACHE_MAX_USERS'] = int(os.environ.get('RULES_CACHE_MAX_USERS', 512))
+# Background jobs run on a thread pool inside each web worker
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_USER_CONCURRENCY'] = int(os.environ.get('JOB_USER_CONCURRENCY', 1))
+app.config['JOB_USER_QUEUE_LIMIT'] = int(os.environ.get('JOB_USER_QUEUE_LIMIT', 10))
+app.config['JOB_POLL_SECONDS'] = float(os.environ.get('JOB_POLL_SECONDS', 2))
+app.config['JOB_STALE_SECONDS'] = float(os.environ.get('JOB_STALE_SECONDS', 600))
+# Change feed long-polling: ?wait= is capped at this many seconds (0 disables it)
+app.config['CHANGES_MAX_WAIT_SECONDS'] = float(os.environ.get('CHANGES_MAX_WAIT_SECONDS', 25))
+app.config['CHANGES_POLL_SECONDS'] = float(os.environ.get('CHANGES_POLL_SECONDS', 1))
+# Change feed entries older than this are pruned; clients further behind refetch
+app.config['CHANGES_RETENTION_DAYS'] = float(os.environ.get('CHANGES_RETENTION_DAYS', 30))
+# Read replicas of DATABASE_URL, and optional user_id shards, as comma-separated
+# URLs; a shard entry may list its own replicas as primary|replica|...
+app.config['DATABASE_REPLICA_URLS'] = os.environ.get('DATABASE_REPLICA_URLS', '')
+app.config['DATABASE_SHARD_URLS'] = os.environ.get('DATABASE_SHARD_URLS', '')
+app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+# Authentication: logged-in users are cached per process for USER_CACHE_SECONDS,
+# and password hashes are computed on a small pool with a bounded queue
+app.config['USER_CACHE_SECONDS'] = float(os.environ.get('USER_CACHE_SECONDS', 30))
+app.config['USER_CACHE_MAX_ENTRIES'] = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 4096))
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_QUEUE_LIMIT'] = int(os.environ.get('PASSWORD_HASH_QUEUE_LIMIT', 32))
 
-db = SQLAlchemy(app)
+# Database routing
+# Writes go to a primary. Reads on GET /api/* and the dashboard go to one of
+# its read replicas, unless the user wrote within REPLICA_STICKY_SECONDS so
+# they always see their own writes. With shards configured, the user table
+# stays on DATABASE_URL and every other table lives on the user's shard;
+# categories are seeded on each shard, so joins never cross databases.
+GLOBAL_TABLES = {'user'}
+REPLICA_READ_ENDPOINTS = {'dashboard'}
+
+def split_urls(value):
+    return [url.strip() for url in (value or '').split(',') if url.strip()]
+
+class DatabaseGroup:
+    """A primary engine and its read replicas, looked up by bind key"""
+    
+    def __init__(self, primary_key, replica_keys):
+        self.primary_key = primary_key
+        self.replica_keys = replica_keys
+        self.turn = itertools.count()
+    
+    @property
+    def primary(self):
+        return db.engines[self.primary_key]
+    
+    def replica(self):
+        """The next replica engine in round-robin order, or None without replicas"""
+        if not self.replica_keys:
+            return None
+        return db.engines[self.replica_keys[next(self.turn) % len(self.replica_keys)]]
+
+class HashShardMap:
+    """Places users on shards by a stable hash of user_id.
+    
+    Any object with shard_for(user_id) -> shard index can take its place as
+    database_router.shard_map, e.g. a lookup table that allows rebalancing.
+    """
+    
+    def __init__(self, count):
+        self.count = count
+    
+    def shard_for(self, user_id):
+        return zlib.crc32(str(user_id).encode()) % self.count
+
+class DatabaseRouter:
+    """Bind keys and engine groups for the default database, its replicas and the shards"""
+    
+    def __init__(self, replica_urls, shard_urls):
+        self.binds = {}
+        self.default = DatabaseGroup(None, self.add_binds('replica', replica_urls))
+        self.shards = []
+        for i, spec in enumerate(shard_urls):
+            primary, *replicas = spec.split('|')
+            self.binds[f'shard-{i}'] = primary
+            self.shards.append(DatabaseGroup(f'shard-{i}', self.add_binds(f'shard-{i}-replica', replicas)))
+        self.shard_map = HashShardMap(len(self.shards)) if self.shards else None
+        self.has_replicas = any(group.replica_keys for group in [self.default] + self.shards)
+    
+    def add_binds(self, prefix, urls):
+        keys = []
+        for i, url in enumerate(urls):
+            keys.append(f'{prefix}-{i}')
+            self.binds[keys[-1]] = url
+        return keys
+    
+    def group(self, shard):
+        return self.default if shard is None else self.shards[shard]
+    
+    def shard_for_user(self, user_id):
+        return None if self.shard_map is None else self.shard_map.shard_for(int(user_id))
+    
+    def contexts(self):
+        """Every shard context: the default database (None), then each shard index"""
+        return [None] + list(range(len(self.shards)))
+
+database_router = DatabaseRouter(
+    split_urls(app.config['DATABASE_REPLICA_URLS']),
+    split_urls(app.config['DATABASE_SHARD_URLS'])
+)
+app.config['SQLALCHEMY_BINDS'] = database_router.binds
+
+SHARD_UNSET = object()
+shard_override = ContextVar('shard_override', default=SHARD_UNSET)
+
+@contextmanager
+def using_shard(shard):
+    """Route per-user tables to shard (None: the default database) inside the block"""
+    token = shard_override.set(shard)
+    try:
+        yield
+    finally:
+        shard_override.reset(token)
+
+def current_shard():
+    """Shard for per-user tables: an explicit using_shard() block, else the logged-in user's"""
+    shard = shard_override.get()
+    if shard is not SHARD_UNSET:
+        return shard
+    if database_router.shard_map is not None and has_request_context():
+        # Flask-Login's session key, so routing needs no query of its own
+        user_id = session.get('_user_id')
+        if user_id is not None:
+            return database_router.shard_for_user(user_id)
+    return None
+
+def copy_user_to_shard(user):
+    """Give a new user a row on their shard so per-user foreign keys hold there.
+    
+    The copy only carries identity; logins always read the default database.
+    """
+    shard = database_router.shard_for_user(user.id)
+    if shard is None:
+        return
+    with database_router.group(shard).primary.begin() as connection:
+        connection.execute(User.__table__.insert().values(
+            id=user.id, username=user.username, email=user.email, password_hash='', created_at=user.created_at
+        ))
+
+def primary_engine():
+    """Engine that writes go to in the current shard context"""
+    return database_router.group(current_shard()).primary
+
+def reads_from_replica():
+    return has_request_context() and g.get('read_from_replica', False)
+
+class RoutingSession(BaseSession):
+    """Session that picks the primary, a replica or a shard for each statement"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+        table = db.inspect(mapper).local_table if mapper is not None else getattr(clause, 'table', None)
+        shard = None if table is not None and table.name in GLOBAL_TABLES else current_shard()
+        group = database_router.group(shard)
+        
+        if self._flushing or getattr(clause, 'is_dml', False):
+            # Later reads in this session must see the write too
+            self.info['wrote'] = True
+            return group.primary
+        # Bare connection()/get_bind() calls are treated as writes
+        if (mapper is None and clause is None) or self.info.get('wrote') or not reads_from_replica():
+            return group.primary
+        # One replica per session, so a request reads a single consistent snapshot
+        key = ('replica', shard)
+        if key not in self.info:
+            self.info[key] = group.replica()
+        return self.info[key] or group.primary
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+@app.before_request
+def route_reads_to_replicas():
+    g.read_from_replica = (
+        database_router.has_replicas
+        and request.method == 'GET'
+        and (request.path.startswith('/api/') or request.endpoint in REPLICA_READ_ENDPOINTS)
+        and time.time() >= session.get('read_primary_until', 0)
+    )
+
+@app.after_request
+def stick_to_primary_after_writes(response):
+    # Read-your-writes: this user's reads skip replicas until they have caught up
+    if database_router.has_replicas and db.session.info.get('wrote'):
+        session['read_primary_until'] = time.time() + app.config['REPLICA_STICKY_SECONDS']
+    return response
+
+@db.event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL journaling so readers don't block the writer under concurrent workers"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+# Instrumentation
+slow_query_log = logging.getLogger('money_tracker.slow_query')
+
+class RequestMetrics:
+    """Rolling per-endpoint timings exposed in Prometheus text format.
+    
+    Each endpoint keeps the last `window` samples of wall time, DB time and
+    query count; quantiles are computed from that window when scraped.
+    """
+    
+    QUANTILES = (0.5, 0.95, 0.99)
+    
+    def __init__(self, window=1024):
+        self.window = window
+        self.lock = threading.Lock()
+        self.endpoints = {}
+    
+    def record(self, endpoint, wall_time, db_time, query_count, rows):
+        with self.lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = {
+                    'wall': deque(maxlen=self.window),
+                    'db': deque(maxlen=self.window),
+                    'queries': deque(maxlen=self.window),
+                    'count': 0,
+                    'wall_sum': 0.0,
+                    'db_sum': 0.0,
+                    'queries_sum': 0,
+                    'rows_sum': 0,
+                }
+            stats['wall'].append(wall_time)
+            stats['db'].append(db_time)
+            stats['queries'].append(query_count)
+            stats['count'] += 1
+            stats['wall_sum'] += wall_time
+            stats['db_sum'] += db_time
+            stats['queries_sum'] += query_count
+            stats['rows_sum'] += rows
+    
+    @staticmethod
+    def quantile(samples, q):
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0
+    
+    def render(self):
+        with self.lock:
+            snapshot = {name: {key: (list(value) if isinstance(value, deque) else value)
+                               for key, value in stats.items()}
+                        for name, stats in self.endpoints.items()}
+        
+        lines = []
+        summaries = (
+            ('money_tracker_request_duration_seconds', 'Request wall time', 'wall', 'wall_sum'),
+            ('money_tracker_request_db_seconds', 'Time spent in database calls per request', 'db', 'db_sum'),
+            ('money_tracker_request_queries', 'SQL statements issued per request', 'queries', 'queries_sum'),
+        )
+        for metric, help_text, samples_key, sum_key in summaries:
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} summary')
+            for endpoint, stats in sorted(snapshot.items()):
+                for q in self.QUANTILES:
+                    value = self.quantile(stats[samples_key], q)
+                    lines.append(f'{metric}{{endpoint="{endpoint}",quantile="{q}"}} {value}')
+                lines.append(f'{metric}_sum{{endpoint="{endpoint}"}} {stats[sum_key]}')
+                lines.append(f'{metric}_count{{endpoint="{endpoint}"}} {stats["count"]}')
+        
+        lines.append('# HELP money_tracker_db_rows_total Rows fetched from the database before the response was returned')
+        lines.append('# TYPE money_tracker_db_rows_total counter')
+        for endpoint, stats in sorted(snapshot.items()):
+            lines.append(f'money_tracker_db_rows_total{{endpoint="{endpoint}"}} {stats["rows_sum"]}')
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+class RowCountingCursor:
+    """DBAPI cursor proxy that adds the number of rows fetched through it to counter[0]"""
+    
+    def __init__(self, cursor, counter):
+        self.cursor = cursor
+        self.counter = counter
+    
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.counter[0] += 1
+        return row
+    
+    def fetchmany(self, *args, **kwargs):
+        rows = self.cursor.fetchmany(*args, **kwargs)
+        self.counter[0] += len(rows)
+        return rows
+    
+    def fetchall(self):
+        rows = self.cursor.fetchall()
+        self.counter[0] += len(rows)
+        return rows
+    
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.db_time = 0.0
+    g.query_count = 0
+    # A list so cursors can keep counting after the hook that reads it
+    g.db_rows = [0]
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    wall_time = time.perf_counter() - started
+    request_metrics.record(request.endpoint or 'unknown', wall_time, g.db_time, g.query_count, g.db_rows[0])
+    response.headers['Server-Timing'] = (
+        f'app;dur={wall_time * 1000:.1f}, db;dur={g.db_time * 1000:.1f};desc="{g.query_count} queries"'
+    )
+    return response
+
+@db.event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@db.event.listens_for(Engine, 'after_cursor_execute')
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    if has_request_context() and 'request_started' in g:
+        g.db_time += elapsed
+        g.query_count += 1
+        # Drivers report SELECT row counts inconsistently (SQLite gives -1), so
+        # count rows as the result fetches them; the CursorResult built after
+        # this event reads context.cursor
+        if context is not None and cursor.description is not None:
+            context.cursor = RowCountingCursor(cursor, g.db_rows)
+    
+    if elapsed * 1000 >= app.config['SLOW_QUERY_MS']:
+        # Log the parameterized statement only; bound values may hold user data
+        # executemany passes one parameter set per row, except for insertmanyvalues
+        # batches, which arrive already flattened into a single row
+        if executemany and parameters and isinstance(parameters[0], (list, tuple, dict)):
+            detail = f'{len(parameters)} rows x {len(parameters[0])} params redacted'
+        else:
+            detail = f'{len(parameters) if parameters else 0} params redacted'
+        slow_query_log.warning('slow query (%.1f ms, %s): %s',
+                               elapsed * 1000, detail, ' '.join(statement.split()))
 
 # Initialize Flask-Login
 login_manager = LoginManager()
@@ -23,7 +414,33 @@ login_manager.login_message = 'Please log in to access this page.'
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return cached_user(int(user_id))
+
+# Money
+# Amounts are stored and aggregated as integer minor units (cents). They are
+# converted from request values with Decimal and rendered with cents_to_json.
+def to_cents(value):
+    """Parse a user-supplied amount into integer cents, raising ValueError if invalid"""
+    try:
+        amount = Decimal(str(value).strip())
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'Invalid amount: {value!r}')
+    if not amount.is_finite():
+        raise ValueError(f'Invalid amount: {value!r}')
+    return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def cents_to_decimal(cents):
+    return Decimal(int(cents or 0)).scaleb(-2)
+
+def cents_to_json(cents):
+    """JSON number for an amount in cents; exact since cents / 100 rounds to the nearest double"""
+    return int(cents or 0) / 100
+
+def parse_currency(value):
+    currency = str(value or app.config['DEFAULT_CURRENCY']).upper()
+    if not re.fullmatch(r'[A-Z]{3}', currency):
+        raise ValueError(f'Invalid currency: {value!r}')
+    return currency
 
 # Database Models
 class User(UserMixin, db.Model):
@@ -38,10 +455,10 @@ class User(UserMixin, db.Model):
     budgets = db.relationship('Budget', backref='user', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -60,28 +477,1691 @@ class Category(db.Model):
         return f'<Category {self.name}>'
 
 class Transaction(db.Model):
+    __table_args__ = (
+        db.Index('ix_transaction_user_date', 'user_id', 'date'),
+        db.Index('ix_transaction_user_category_date', 'user_id', 'category_id', 'date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount_cents = db.Column(db.BigInteger, nullable=False)  # minor units of currency
+    currency = db.Column(db.String(3), nullable=False, default=lambda: app.config['DEFAULT_CURRENCY'])
     description = db.Column(db.String(200))
+    merchant = db.Column(db.String(100))  # set by a matching CategoryRule's alias
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date())
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @property
+    def amount(self):
+        return cents_to_decimal(self.amount_cents)
+    
     def __repr__(self):
-        return f'<Transaction {self.amount} - {self.description}>'
+        return f'<Transaction {self.amount} {self.currency} - {self.description}>'
 
 class Budget(db.Model):
+    __table_args__ = (
+        db.Index('ux_budget_user_category_period', 'user_id', 'category_id', 'year', 'month', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    amount_cents = db.Column(db.BigInteger, nullable=False)  # minor units of currency
+    currency = db.Column(db.String(3), nullable=False, default=lambda: app.config['DEFAULT_CURRENCY'])
     month = db.Column(db.Integer, nullable=False)  # 1-12
     year = db.Column(db.Integer, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    @property
+    def amount(self):
+        return cents_to_decimal(self.amount_cents)
+    
+    def __repr__(self):
+        return f'<Budget {self.amount} {self.currency} for {self.month}/{self.year}>'
+
+class MonthlyRollup(db.Model):
+    """Per-user spending totals by month and category, maintained on every transaction write"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)  # 1-12
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), primary_key=True)
+    total_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<MonthlyRollup {self.user_id} {self.month}/{self.year} {self.category_id}>'
+
+class CategoryRule(db.Model):
+    """Per-user rule that categorizes transactions by description and amount"""
+    __table_args__ = (
+        db.Index('ix_category_rule_user_priority', 'user_id', 'priority', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    match_type = db.Column(db.String(10), nullable=False, default='contains')  # 'contains' or 'regex'
+    pattern = db.Column(db.String(200), nullable=False, default='')  # empty matches any description
+    min_amount_cents = db.Column(db.BigInteger)
+    max_amount_cents = db.Column(db.BigInteger)
+    merchant = db.Column(db.String(100))  # alias recorded on matched transactions
+    priority = db.Column(db.Integer, nullable=False, default=100)  # lowest wins
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CategoryRule {self.match_type} {self.pattern!r} -> {self.category_id}>'
+
+class RecurringTransaction(db.Model):
+    """RRULE-like schedule for a repeating transaction.
+    
+    Occurrences are numbered from start_date; next_index/next_date point at
+    the first one not yet written to the transaction table (next_date is
+    None once the schedule is exhausted).
+    """
+    __table_args__ = (
+        db.Index('ix_recurring_user_next', 'user_id', 'next_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), nullable=False)
+    amount_cents = db.Column(db.BigInteger, nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default=lambda: app.config['DEFAULT_CURRENCY'])
+    description = db.Column(db.String(200))
+    frequency = db.Column(db.String(10), nullable=False)  # daily, weekly, monthly, yearly
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    start_date = db.Column(db.Date, nullable=False)
+    until = db.Column(db.Date)
+    count = db.Column(db.Integer)  # total occurrences, if limited
+    next_index = db.Column(db.Integer, nullable=False, default=0)
+    next_date = db.Column(db.Date)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
     def __repr__(self):
-        return f'<Budget {self.amount} for {self.month}/{self.year}>'
+        return f'<RecurringTransaction {self.frequency}/{self.interval} {self.description}>'
+
+class CacheVersion(db.Model):
+    """Monotonic version counters used to invalidate per-process caches across workers"""
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class ChangeLog(db.Model):
+    """Append-only per-user feed of transaction and budget writes, served by /api/changes.
+    
+    seq is gapless per user; op is 'upsert', 'delete', or 'reset' (bulk writes
+    whose rows are not listed, so clients must refetch that entity). Entries
+    older than CHANGES_RETENTION_DAYS are deleted by prune_change_log.
+    """
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'seq', name='uq_change_log_user_seq'),
+        db.Index('ix_change_log_created', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    seq = db.Column(db.BigInteger, nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # transaction, budget
+    entity_id = db.Column(db.Integer)
+    op = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Job(db.Model):
+    """Background job; the table doubles as the queue so jobs survive restarts"""
+    __table_args__ = (
+        db.Index('ix_job_status_id', 'status', 'id'),
+        db.Index('ix_job_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(30), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    input = db.Column(db.LargeBinary)
+    progress = db.Column(db.Integer, nullable=False, default=0)  # 0-100
+    result = db.Column(db.LargeBinary)
+    result_mimetype = db.Column(db.String(100))
+    error = db.Column(db.String(500))
+    worker = db.Column(db.String(100))
+    heartbeat_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+class JobResultChunk(db.Model):
+    """One piece of a large job result, written as the job produces it and read back in seq order"""
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id'), primary_key=True)
+    seq = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+def bump_cache_version(connection, name, by=1):
+    """Increment the named cache version inside the caller's transaction"""
+    table = CacheVersion.__table__
+    dialect = connection.dialect.name
+    
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        # One statement, so concurrent first bumps of a new name can't both insert
+        connection.execute(insert(table).values(name=name, version=by).on_conflict_do_update(
+            index_elements=['name'], set_={'version': table.c.version + by}
+        ))
+        return
+    
+    result = connection.execute(
+        table.update().where(table.c.name == name).values(version=table.c.version + by)
+    )
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(name=name, version=by))
+
+@db.event.listens_for(Category, 'after_insert')
+@db.event.listens_for(Category, 'after_update')
+@db.event.listens_for(Category, 'after_delete')
+def category_changed(mapper, connection, target):
+    bump_cache_version(connection, 'categories')
+    # Make this process re-check the version on its next lookup
+    category_cache.checked_at = 0.0
+
+@db.event.listens_for(CategoryRule, 'after_insert')
+@db.event.listens_for(CategoryRule, 'after_update')
+@db.event.listens_for(CategoryRule, 'after_delete')
+def category_rule_changed(mapper, connection, target):
+    bump_cache_version(connection, f'rules:{target.user_id}')
+
+# Change feed
+# Every write to a user's transactions or budgets appends to ChangeLog in the
+# same database transaction. The per-user sequence is a CacheVersion counter,
+# whose row lock makes one user's writes commit in sequence order.
+CHANGES_PAGE_SIZE = 1000
+CHANGE_ENTITIES = ('transaction', 'budget')
+
+change_notifier = threading.Condition()
+
+def record_changes(connection, user_id, entity, op, entity_ids):
+    """Append one change per entity id to user_id's feed inside the caller's transaction"""
+    name = f'changes:{user_id}'
+    bump_cache_version(connection, name, by=len(entity_ids))
+    table = CacheVersion.__table__
+    last = connection.execute(db.select(table.c.version).where(table.c.name == name)).scalar()
+    first = last - len(entity_ids) + 1
+    now = datetime.utcnow()
+    connection.execute(ChangeLog.__table__.insert(), [
+        {'user_id': user_id, 'seq': first + i, 'entity': entity, 'entity_id': entity_id, 'op': op, 'created_at': now}
+        for i, entity_id in enumerate(entity_ids)
+    ])
+    db.session.info['changes_recorded'] = True
+
+def record_reset(user_id, entity):
+    """Tell clients to refetch entity after a bulk write that does not list its rows"""
+    record_changes(db.session.connection(), user_id, entity, 'reset', [None])
+
+@db.event.listens_for(db.session, 'after_commit')
+def notify_change_waiters(session):
+    if session.info.pop('changes_recorded', False):
+        with change_notifier:
+            change_notifier.notify_all()
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_recorded_changes(session):
+    session.info.pop('changes_recorded', None)
+
+@db.event.listens_for(Transaction, 'after_insert')
+@db.event.listens_for(Transaction, 'after_update')
+def transaction_saved(mapper, connection, target):
+    record_changes(connection, target.user_id, 'transaction', 'upsert', [target.id])
+
+@db.event.listens_for(Transaction, 'after_delete')
+def transaction_deleted(mapper, connection, target):
+    record_changes(connection, target.user_id, 'transaction', 'delete', [target.id])
+
+@db.event.listens_for(Budget, 'after_insert')
+@db.event.listens_for(Budget, 'after_update')
+def budget_saved(mapper, connection, target):
+    record_changes(connection, target.user_id, 'budget', 'upsert', [target.id])
+
+@db.event.listens_for(Budget, 'after_delete')
+def budget_deleted(mapper, connection, target):
+    record_changes(connection, target.user_id, 'budget', 'delete', [target.id])
+
+def current_change_seq(user_id):
+    """The last sequence number in user_id's change feed (0 if it is empty)"""
+    return db.session.query(CacheVersion.version).filter_by(name=f'changes:{user_id}').scalar() or 0
+
+CHANGES_PRUNE_BATCH = 10000
+CHANGES_PRUNE_INTERVAL = 3600
+
+def prune_change_log():
+    """Delete change feed entries past CHANGES_RETENTION_DAYS in batches; returns rows deleted"""
+    if app.config['CHANGES_RETENTION_DAYS'] <= 0:
+        return 0
+    table = ChangeLog.__table__
+    cutoff = datetime.utcnow() - timedelta(days=app.config['CHANGES_RETENTION_DAYS'])
+    deleted = 0
+    while True:
+        expired = db.select(table.c.id).where(table.c.created_at < cutoff).limit(CHANGES_PRUNE_BATCH)
+        count = db.session.execute(table.delete().where(table.c.id.in_(expired))).rowcount
+        db.session.commit()
+        deleted += count
+        if count < CHANGES_PRUNE_BATCH:
+            return deleted
+
+def month_bounds(year, month):
+    """Return the half-open [start, end) date range covering year/month"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+def in_month(column, year, month):
+    """Index-friendly predicate matching dates that fall in year/month"""
+    start, end = month_bounds(year, month)
+    return db.and_(column >= start, column < end)
+
+# Category cache
+CachedCategory = namedtuple('CachedCategory', ['id', 'name', 'type', 'color'])
+
+class CategoryCache:
+    """Process-wide copy of the Category table.
+    
+    The table is small and rarely written, so it is held in memory and only
+    reloaded when the 'categories' CacheVersion row changes. The version is
+    re-checked at most once per check_interval seconds so other worker
+    processes pick up writes without a query on every request.
+    """
+    
+    def __init__(self, check_interval=5.0):
+        self.check_interval = check_interval
+        self.lock = threading.Lock()
+        self.version = None
+        self.checked_at = 0.0
+        self.categories = []
+        self.by_id = {}
+        self.by_name = {}
+        self.body = b'[]'
+        self.etag = ''
+    
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and self.version is not None and now - self.checked_at < self.check_interval:
+            return
+        with self.lock:
+            version = db.session.query(CacheVersion.version).filter_by(name='categories').scalar() or 0
+            if force or version != self.version:
+                self.load(version)
+            self.checked_at = now
+    
+    def load(self, version):
+        categories = [CachedCategory(c.id, c.name, c.type, c.color)
+                      for c in Category.query.order_by(Category.id).all()]
+        self.categories = categories
+        self.by_id = {c.id: c for c in categories}
+        self.by_name = {c.name.lower(): c for c in categories}
+        self.body = app.json.dumps([c._asdict() for c in categories]).encode()
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self.version = version
+    
+    def get(self, category_id):
+        self.refresh()
+        try:
+            return self.by_id.get(int(category_id))
+        except (TypeError, ValueError):
+            return None
+    
+    def all(self):
+        self.refresh()
+        return self.categories
+    
+    def get_by_name(self, name):
+        self.refresh()
+        return self.by_name.get(name.strip().lower())
+
+category_cache = CategoryCache()
+
+# Stats cache
+class MemoryCacheBackend:
+    """Thread-safe in-process LRU store with a fixed entry cap"""
+    
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+    
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+class RedisCacheBackend:
+    """Store backed by a Redis-compatible server; eviction is left to its maxmemory policy"""
+    
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+    
+    def get(self, key):
+        value = self.client.get(key)
+        return value.decode() if value is not None else None
+    
+    def set(self, key, value):
+        self.client.set(key, value)
+
+class StatsCache:
+    """Per-user, per-month cache of rendered stats responses.
+    
+    Versions are CacheVersion counters bumped in the same database
+    transaction as the rollup write they cover, so every worker process sees
+    a write as soon as it commits: 'stats:<user>:<year>:<month>' per month,
+    'stats:<user>' for the whole ledger and 'stats' for rollup rebuilds. The
+    token built from them doubles as the response's weak ETag, so a
+    revalidating client gets a 304 after one primary-key lookup and no stats
+    query. Cached bodies are keyed by the token, so a bump makes the old
+    entry unreachable and LRU eviction reclaims it.
+    """
+    
+    def __init__(self, backend):
+        self.backend = backend
+    
+    def version(self, user_id, year=None, month=None):
+        """Token for one month, or for the user's whole ledger when year is None"""
+        names = ['stats', f'stats:{user_id}' if year is None else f'stats:{user_id}:{year}:{month}']
+        versions = dict(db.session.query(CacheVersion.name, CacheVersion.version).filter(
+            CacheVersion.name.in_(names)
+        ).all())
+        return '-'.join(str(versions.get(name, 0)) for name in names)
+    
+    def get(self, kind, user_id, year, month, version):
+        return self.backend.get(f'{kind}:{user_id}:{year}:{month}:{version}')
+    
+    def set(self, kind, user_id, year, month, version, body):
+        self.backend.set(f'{kind}:{user_id}:{year}:{month}:{version}', body)
+
+def create_stats_cache():
+    if app.config['STATS_CACHE_URL']:
+        return StatsCache(RedisCacheBackend(app.config['STATS_CACHE_URL']))
+    return StatsCache(MemoryCacheBackend(app.config['STATS_CACHE_MAX_ENTRIES']))
+
+stats_cache = create_stats_cache()
+
+def bump_stats_versions(user_id, year, month):
+    """Invalidate cached stats for user_id's month as part of the current transaction"""
+    # Once per transaction is enough; the bumps commit or roll back with the write
+    bumped = db.session.info.setdefault('stats_bumped', set())
+    for name in (f'stats:{user_id}:{year}:{month}', f'stats:{user_id}'):
+        if name not in bumped:
+            bump_cache_version(db.session.connection(), name)
+            bumped.add(name)
+
+@db.event.listens_for(db.session, 'after_commit')
+@db.event.listens_for(db.session, 'after_rollback')
+def reset_stats_bumps(session):
+    session.info.pop('stats_bumped', None)
+
+# User cache
+# Flask-Login loads current_user on every authenticated request. Users are
+# cached per process as detached instances and merged into the request's
+# session without a query. Writes in this process evict the entry on commit;
+# other processes see them once USER_CACHE_SECONDS has passed.
+user_cache = MemoryCacheBackend(app.config['USER_CACHE_MAX_ENTRIES'])
+
+def cached_user(user_id):
+    ttl = app.config['USER_CACHE_SECONDS']
+    cached = user_cache.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return db.session.merge(cached[1], load=False)
+    user = db.session.get(User, user_id)
+    if user is not None and ttl > 0:
+        detached = User(**{column.key: getattr(user, column.key) for column in User.__mapper__.column_attrs})
+        make_transient_to_detached(detached)
+        user_cache.set(user_id, (time.monotonic() + ttl, detached))
+    return user
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def user_changed(mapper, connection, target):
+    db.session.info.setdefault('users_dirty', set()).add(target.id)
+
+@db.event.listens_for(db.session, 'after_commit')
+def evict_users_after_commit(session):
+    for user_id in session.info.pop('users_dirty', ()):
+        user_cache.delete(user_id)
+
+@db.event.listens_for(db.session, 'after_rollback')
+def discard_users_after_rollback(session):
+    session.info.pop('users_dirty', None)
+
+# Password hashing
+class PasswordHasherBusy(Exception):
+    """Raised when more password hashes are waiting than the queue allows"""
+
+class PasswordHasher:
+    """Computes password hashes on a fixed-size thread pool.
+    
+    PBKDF2 and scrypt release the GIL, so at most `workers` hashes compete
+    with request threads for CPU, and once `queue_limit` calls are in flight
+    new ones fail fast with PasswordHasherBusy instead of queueing behind
+    them. Hashes whose method differs from `method` are reported by
+    needs_rehash so they can be upgraded on the next successful login.
+    """
+    
+    def __init__(self, method, workers, queue_limit):
+        self.method = method
+        self.workers = workers
+        self.slots = threading.BoundedSemaphore(queue_limit)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pid = None
+        self.prefix = None
+    
+    def submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            with self.lock:
+                # Pool threads do not survive a fork, so each process makes its own
+                if self.pid != os.getpid():
+                    from concurrent.futures import ThreadPoolExecutor
+                    self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+                    self.pid = os.getpid()
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+    
+    def hash(self, password):
+        return self.submit(generate_password_hash, password, self.method)
+    
+    def verify(self, password_hash, password):
+        if not password_hash:
+            return False
+        return self.submit(check_password_hash, password_hash, password)
+    
+    def needs_rehash(self, password_hash):
+        if self.prefix is None:
+            # werkzeug fills in defaults, e.g. 'scrypt' is stored as 'scrypt:32768:8:1'
+            self.prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self.prefix
+
+password_hasher = PasswordHasher(app.config['PASSWORD_HASH_METHOD'], app.config['PASSWORD_HASH_WORKERS'],
+                                 app.config['PASSWORD_HASH_QUEUE_LIMIT'])
+
+def cached_stats_response(kind, user_id, year, month, compute):
+    """Serve a per-month stats payload from the cache with a weak ETag.
+    
+    compute() is only called when the client's copy and the cache are both
+    stale for the current version.
+    """
+    if not (1 <= month <= 12 and 1 <= year <= 9999):
+        raise ValueError(f'Invalid month: {year}-{month}')
+    version = stats_cache.version(user_id, year, month)
+    if request.if_none_match.contains_weak(version):
+        response = Response(status=304)
+    else:
+        body = stats_cache.get(kind, user_id, year, month, version)
+        if body is None:
+            body = app.json.dumps(compute())
+            stats_cache.set(kind, user_id, year, month, version, body)
+        response = Response(body, mimetype='application/json')
+    response.set_etag(version, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# Rollups
+def update_rollup(user_id, category_id, day, amount_cents, count):
+    """Add amount_cents/count to the rollup bucket for day's month in the current transaction"""
+    table = MonthlyRollup.__table__
+    key = {'user_id': user_id, 'year': day.year, 'month': day.month, 'category_id': category_id}
+    bump_stats_versions(user_id, day.year, day.month)
+    dialect = db.session.get_bind().dialect.name
+    
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(total_cents=amount_cents, count=count, **key)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={'total_cents': table.c.total_cents + amount_cents, 'count': table.c.count + count}
+        )
+        db.session.execute(stmt)
+        return
+    
+    result = db.session.execute(
+        table.update().filter_by(**key).values(
+            total_cents=table.c.total_cents + amount_cents, count=table.c.count + count
+        )
+    )
+    if result.rowcount == 0:
+        db.session.execute(table.insert().values(total_cents=amount_cents, count=count, **key))
+
+def rollup_add(transaction):
+    update_rollup(transaction.user_id, transaction.category_id, transaction.date, transaction.amount_cents, 1)
+
+def rollup_remove(transaction):
+    update_rollup(transaction.user_id, transaction.category_id, transaction.date, -transaction.amount_cents, -1)
+
+def rebuild_rollups(user_id=None):
+    """Recompute rollups from raw transactions, for one user or everyone"""
+    table = MonthlyRollup.__table__
+    year_col = db.extract('year', Transaction.date)
+    month_col = db.extract('month', Transaction.date)
+    
+    source = db.select(
+        Transaction.user_id,
+        year_col,
+        month_col,
+        Transaction.category_id,
+        db.func.sum(Transaction.amount_cents),
+        db.func.count(Transaction.id)
+    ).group_by(Transaction.user_id, year_col, month_col, Transaction.category_id)
+    delete = table.delete()
+    if user_id is not None:
+        source = source.where(Transaction.user_id == user_id)
+        delete = delete.where(table.c.user_id == user_id)
+    
+    db.session.execute(delete)
+    db.session.execute(table.insert().from_select(
+        ['user_id', 'year', 'month', 'category_id', 'total_cents', 'count'], source
+    ))
+    bump_cache_version(db.session.connection(), 'stats')
+    db.session.commit()
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Backfill or repair the monthly rollup table from transactions."""
+    for shard in database_router.contexts():
+        with app.app_context(), using_shard(shard):
+            rebuild_rollups()
+    print("✅ Monthly rollups rebuilt successfully!")
+
+# Serialization
+# Listing and detail endpoints select plain columns joined to Category so a
+# page of N rows costs one query instead of 1 + N lazy category loads.
+TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.amount_cents,
+    Transaction.currency,
+    Transaction.description,
+    Transaction.merchant,
+    Transaction.date,
+    Transaction.category_id,
+    Category.name.label('category_name'),
+    Category.type.label('category_type'),
+    Category.color.label('category_color'),
+)
+
+BUDGET_COLUMNS = (
+    Budget.id,
+    Budget.category_id,
+    Category.name.label('category_name'),
+    Budget.amount_cents,
+    Budget.currency,
+    Budget.month,
+    Budget.year,
+    Budget.created_at,
+)
+
+def transaction_rows(user_id):
+    """Query of transaction rows (with category columns) owned by user_id"""
+    return db.session.query(*TRANSACTION_COLUMNS).join(
+        Category, Transaction.category_id == Category.id
+    ).filter(Transaction.user_id == user_id)
+
+def budget_rows(user_id):
+    """Query of budget rows (with category columns) owned by user_id"""
+    return db.session.query(*BUDGET_COLUMNS).join(
+        Category, Budget.category_id == Category.id
+    ).filter(Budget.user_id == user_id)
+
+def serialize_transaction(row):
+    return {
+        'id': row.id,
+        'amount': cents_to_json(row.amount_cents),
+        'amount_cents': row.amount_cents,
+        'currency': row.currency,
+        'description': row.description,
+        'merchant': row.merchant,
+        'date': row.date.isoformat(),
+        'category_id': row.category_id,
+        'category_name': row.category_name,
+        'category_type': row.category_type,
+        'category_color': row.category_color
+    }
+
+def serialize_budget(row):
+    return {
+        'id': row.id,
+        'category_id': row.category_id,
+        'category_name': row.category_name,
+        'amount': cents_to_json(row.amount_cents),
+        'amount_cents': row.amount_cents,
+        'currency': row.currency,
+        'month': row.month,
+        'year': row.year,
+        'created_at': row.created_at.isoformat()
+    }
+
+# Stats
+def monthly_summaries(user_id, start_year, start_month, end_year, end_month):
+    """Income, expenses and transaction count for every month in an inclusive range.
+
+    All months are aggregated in a single grouped query over the rollup table
+    using conditional sums over Category.type; months with no transactions
+    are filled with zeros.
+    """
+    # Reject out-of-range months before querying
+    month_bounds(start_year, start_month)
+    month_bounds(end_year, end_month)
+    
+    rows = db.session.query(
+        MonthlyRollup.year,
+        MonthlyRollup.month,
+        db.func.sum(db.case((Category.type == 'income', MonthlyRollup.total_cents), else_=0)).label('income'),
+        db.func.sum(db.case((Category.type == 'expense', MonthlyRollup.total_cents), else_=0)).label('expenses'),
+        db.func.sum(MonthlyRollup.count).label('transaction_count')
+    ).join(Category, MonthlyRollup.category_id == Category.id).filter(
+        MonthlyRollup.user_id == user_id,
+        db.tuple_(MonthlyRollup.year, MonthlyRollup.month) >= db.tuple_(start_year, start_month),
+        db.tuple_(MonthlyRollup.year, MonthlyRollup.month) <= db.tuple_(end_year, end_month)
+    ).group_by(MonthlyRollup.year, MonthlyRollup.month).all()
+    totals = {(int(r.year), int(r.month)): r for r in rows}
+    
+    summaries = []
+    year, month = start_year, start_month
+    while (year, month) <= (end_year, end_month):
+        r = totals.get((year, month))
+        # Integer cents until rendering, so balance is exact
+        income = int(r.income or 0) if r else 0
+        expenses = int(r.expenses or 0) if r else 0
+        summaries.append({
+            'month': month,
+            'year': year,
+            'income': cents_to_json(income),
+            'expenses': cents_to_json(expenses),
+            'balance': cents_to_json(income - expenses),
+            'transaction_count': int(r.transaction_count or 0) if r else 0
+        })
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return summaries
+
+def monthly_summary(user_id, year, month):
+    """Income, expenses and transaction count for a single month"""
+    return monthly_summaries(user_id, year, month, year, month)[0]
+
+def spending_by_category(user_id, year, month):
+    """Expense totals per category for one month"""
+    results = db.session.query(
+        Category.name,
+        Category.color,
+        MonthlyRollup.total_cents
+    ).join(MonthlyRollup, MonthlyRollup.category_id == Category.id).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.year == year,
+        MonthlyRollup.month == month,
+        MonthlyRollup.count > 0,
+        Category.type == 'expense'
+    ).all()
+    
+    return [{
+        'category': r.name,
+        'amount': cents_to_json(r.total_cents),
+        'color': r.color
+    } for r in results]
+
+def parse_year_month(value):
+    """Parse a 'YYYY-MM' string into a (year, month) tuple"""
+    parsed = datetime.strptime(value, '%Y-%m')
+    return parsed.year, parsed.month
+
+# Trend analytics
+TREND_WINDOWS = (3, 6, 12)
+ANOMALY_Z_SCORE = 2.0
+ANOMALY_MIN_HISTORY = 3
+
+def load_history(user_id):
+    """Pull a user's monthly totals into a dense category x month matrix in one query.
+    
+    Returns (category_ids, first_month_index, matrix) where month indexes
+    count months since year 0 (year * 12 + month - 1) and the matrix holds
+    integer cents.
+    """
+    rows = db.session.query(
+        MonthlyRollup.category_id,
+        MonthlyRollup.year * 12 + MonthlyRollup.month - 1,
+        MonthlyRollup.total_cents
+    ).filter(MonthlyRollup.user_id == user_id, MonthlyRollup.count > 0).all()
+    if not rows:
+        return np.array([], dtype=np.int64), 0, np.zeros((0, 0), dtype=np.int64)
+    
+    data = np.array(rows, dtype=np.int64)
+    category_ids, category_index = np.unique(data[:, 0], return_inverse=True)
+    month_index = data[:, 1]
+    first_month = int(month_index.min())
+    matrix = np.zeros((len(category_ids), int(month_index.max()) - first_month + 1), dtype=np.int64)
+    matrix[category_index, month_index - first_month] = data[:, 2]
+    return category_ids, first_month, matrix
+
+def rolling_mean(matrix, window):
+    """Trailing mean over up to `window` months along axis 1"""
+    cumulative = np.cumsum(np.pad(matrix, ((0, 0), (1, 0))), axis=1)
+    months = matrix.shape[1]
+    lagged = np.maximum(np.arange(1, months + 1) - window, 0)
+    counts = np.minimum(np.arange(1, months + 1), window)
+    return (cumulative[:, 1:] - cumulative[:, lagged]) / counts
+
+def compute_trends(category_ids, first_month, matrix, today):
+    """Vectorized trend series for every category, clipped or extended to end at today's month"""
+    current_month = today.year * 12 + today.month - 1
+    # Future-dated rows must not shift the series: drop months after today,
+    # then pad with empty months so every series ends "now"
+    if first_month > current_month:
+        matrix, first_month = matrix[:, :0], current_month
+    matrix = matrix[:, :current_month - first_month + 1]
+    pad = current_month - first_month + 1 - matrix.shape[1]
+    # Statistics need floats; each total converts from cents exactly
+    matrix = np.pad(matrix, ((0, 0), (0, pad))) / 100
+    months = matrix.shape[1]
+    
+    rolling = {window: rolling_mean(matrix, window) for window in TREND_WINDOWS}
+    
+    previous = np.pad(matrix, ((0, 0), (1, 0)))[:, :-1]
+    mom_delta = matrix - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mom_pct = np.where(previous > 0, mom_delta / previous * 100, np.nan)
+    
+    # Anomaly: month more than ANOMALY_Z_SCORE std devs above the prior 12 months
+    window = TREND_WINDOWS[-1]
+    padded = np.pad(matrix, ((0, 0), (1, 0)))
+    sums = np.cumsum(padded, axis=1)
+    squares = np.cumsum(padded ** 2, axis=1)
+    end = np.arange(months)
+    start = np.maximum(end - window, 0)
+    counts = end - start
+    with np.errstate(divide='ignore', invalid='ignore'):
+        prior_mean = (sums[:, end] - sums[:, start]) / counts
+        prior_var = (squares[:, end] - squares[:, start]) / counts - prior_mean ** 2
+        z_score = (matrix - prior_mean) / np.sqrt(np.maximum(prior_var, 0))
+    anomalies = (counts >= ANOMALY_MIN_HISTORY) & (matrix > prior_mean) & (z_score > ANOMALY_Z_SCORE)
+    
+    # Forecast: month-to-date plus the recent average for the days still to come
+    month_start, month_end = month_bounds(today.year, today.month)
+    days_in_month = (month_end - month_start).days
+    remaining = (days_in_month - today.day) / days_in_month
+    month_to_date = matrix[:, current_month - first_month]
+    baseline = rolling[3][:, -2] if months > 1 else np.zeros(len(category_ids))
+    projected = month_to_date + remaining * baseline
+    
+    return {
+        'first_month': first_month,
+        'category_ids': category_ids,
+        'totals': matrix,
+        'rolling': rolling,
+        'mom_delta': mom_delta,
+        'mom_pct': mom_pct,
+        'anomalies': anomalies,
+        'month_to_date': month_to_date,
+        'projected': projected,
+    }
+
+def to_json_list(values):
+    """Round and convert an array to a list, mapping NaN/inf to None"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), np.round(values, 2), None).tolist()
+
+trends_cache = MemoryCacheBackend(app.config['TRENDS_CACHE_MAX_USERS'])
+
+def user_trends(user_id, today):
+    """Computed trend arrays for a user, cached until their next transaction write"""
+    version = stats_cache.version(user_id)
+    cached = trends_cache.get(user_id)
+    if cached and cached[0] == version and cached[1] == today:
+        return cached[2]
+    trends = compute_trends(*load_history(user_id), today)
+    trends_cache.set(user_id, (version, today, trends))
+    return trends
+
+# Categorization rules
+UNCATEGORIZED = 'Uncategorized'
+RULES_MAX_PER_USER = 500
+RULES_APPLY_BATCH = 1000
+RULE_MATCH_TYPES = ('contains', 'regex')
+RULE_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+RULE_REGEX_MAX_LENGTH = 100
+# Quantifiers that make a group match a variable amount, and ones that repeat a group
+RULE_QUANTIFIER = re.compile(r'[*+?]|\{\d*,\d*\}')
+RULE_REPEAT = re.compile(r'[*+]|\{\d*,?\d*\}')
+
+CachedRule = namedtuple('CachedRule', [
+    'id', 'category_id', 'category_type', 'min_amount_cents', 'max_amount_cents', 'merchant'
+])
+
+def validate_rule(match_type, pattern):
+    """Raise ValueError if a rule can't be compiled into the combined matcher"""
+    if match_type not in RULE_MATCH_TYPES:
+        raise ValueError('Invalid match type')
+    if match_type == 'regex':
+        # Regex rules are joined into one alternation, so numbered backreferences would shift
+        if len(pattern) > RULE_REGEX_MAX_LENGTH:
+            raise ValueError(f'Pattern is longer than {RULE_REGEX_MAX_LENGTH} characters')
+        if RULE_BACKREFERENCE.search(pattern):
+            raise ValueError('Backreferences are not supported')
+        # Rules run on every imported row; a repeated group that itself repeats,
+        # such as (a+)+, can backtrack exponentially and stall the import
+        if has_nested_quantifier(pattern):
+            raise ValueError('Pattern is too complex: nested quantifiers are not supported')
+        try:
+            re.compile(pattern)
+            # Compiling it twice as alternatives catches what only breaks once
+            # joined with other rules: global inline flags such as (?i) that
+            # are no longer at the start, and named groups defined twice
+            combined_regex([pattern, pattern])
+        except re.error as e:
+            raise ValueError(f'Invalid pattern: {e}')
+
+def has_nested_quantifier(pattern):
+    """True if a group that repeats contains a quantifier, e.g. (a+)+ or (x\\w*)*"""
+    groups = [False]  # per open group: whether anything inside it is quantified
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            # Skip the character class; a ']' right after '[' or '[^' is literal
+            i += 2 if pattern[i + 1:i + 2] == '^' else 1
+            i += 1 if pattern[i:i + 1] == ']' else 0
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+        elif char == '(':
+            groups.append(False)
+            # The '?' of (?:...), (?i) and friends is not a quantifier
+            i += 1 if pattern[i + 1:i + 2] == '?' else 0
+        elif char == ')' and len(groups) > 1:
+            inner = groups.pop()
+            if inner and RULE_REPEAT.match(pattern, i + 1):
+                return True
+            groups[-1] = groups[-1] or inner
+        elif RULE_QUANTIFIER.match(pattern, i):
+            groups[-1] = True
+        i += 1
+    return False
+
+def combined_regex(patterns):
+    """One case-insensitive alternation of patterns, used as a prefilter"""
+    return re.compile('|'.join(f'(?:{pattern})' for pattern in patterns), re.IGNORECASE)
+
+class RuleMatcher:
+    """All of a user's rules compiled for a single pass over each description.
+    
+    'contains' rules are merged into one Aho-Corasick automaton over the
+    lowercased text, so finding every literal hit costs one walk of the
+    description however many rules there are. 'regex' rules are joined into
+    one alternation used as a prefilter; only when it matches are they
+    checked individually. The first candidate in priority order whose amount
+    range and category type also fit wins. Matching is case-insensitive.
+    """
+    
+    def __init__(self, rules, kinds):
+        self.rules = rules
+        self.always = []
+        self.regexes = []
+        # Aho-Corasick trie: goto transitions, failure links and rule indexes per state
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+        for index, (rule, (match_type, pattern)) in enumerate(zip(rules, kinds)):
+            if not pattern:
+                self.always.append(index)
+            elif match_type == 'regex':
+                self.regexes.append((index, re.compile(pattern, re.IGNORECASE)))
+            else:
+                self.add_literal(index, pattern.lower())
+        self.link()
+        self.any_regex = None
+        if self.regexes:
+            try:
+                self.any_regex = combined_regex([r.pattern for _, r in self.regexes])
+            except re.error:
+                # Rules saved before validation covered joining: check each one instead
+                app.logger.warning('Regex rules could not be combined; matching them one by one')
+        self.check_each_regex = bool(self.regexes) and self.any_regex is None
+    
+    def add_literal(self, index, literal):
+        state = 0
+        for char in literal:
+            following = self.goto[state].get(char)
+            if following is None:
+                following = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(())
+                self.goto[state][char] = following
+            state = following
+        self.output[state] += (index,)
+    
+    def link(self):
+        """Breadth-first pass setting failure links and merging their outputs"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, following in self.goto[state].items():
+                queue.append(following)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[following] = self.goto[fallback].get(char, 0) if state else 0
+                self.output[following] += self.output[self.fail[following]]
+    
+    def candidates(self, text):
+        found = set(self.always)
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        if self.check_each_regex or (self.any_regex and self.any_regex.search(text)):
+            found.update(index for index, regex in self.regexes if regex.search(text))
+        return found
+    
+    def match(self, description, amount_cents, category_type=None):
+        if not self.rules:
+            return None
+        for index in sorted(self.candidates(description or '')):
+            rule = self.rules[index]
+            if rule.min_amount_cents is not None and amount_cents < rule.min_amount_cents:
+                continue
+            if rule.max_amount_cents is not None and amount_cents > rule.max_amount_cents:
+                continue
+            if category_type and rule.category_type != category_type:
+                continue
+            return rule
+        return None
+
+rules_cache = MemoryCacheBackend(app.config['RULES_CACHE_MAX_USERS'])
+
+def user_rule_matcher(user_id):
+    """Compiled rules for a user, rebuilt only after their rules change"""
+    version = db.session.query(CacheVersion.version).filter_by(name=f'rules:{user_id}').scalar() or 0
+    cached = rules_cache.get(user_id)
+    if cached and cached[0] == version:
+        return cached[1]
+    rules = db.session.query(CategoryRule, Category.type).join(Category).filter(
+        CategoryRule.user_id == user_id
+    ).order_by(CategoryRule.priority, CategoryRule.id).all()
+    matcher = RuleMatcher(
+        [CachedRule(r.id, r.category_id, category_type, r.min_amount_cents, r.max_amount_cents, r.merchant)
+         for r, category_type in rules],
+        [(r.match_type, r.pattern) for r, _ in rules]
+    )
+    rules_cache.set(user_id, (version, matcher))
+    return matcher
+
+def uncategorized_category():
+    return category_cache.get_by_name(UNCATEGORIZED)
+
+def apply_rules(user_id, transaction_ids=None, scope='uncategorized', start_date=None, end_date=None, on_batch=None):
+    """Re-run a user's rules over stored transactions, committing in batches.
+    
+    scope 'uncategorized' only considers transactions in the Uncategorized
+    category; 'all' re-evaluates every selected transaction. Dates are
+    'YYYY-MM-DD' strings. Rows no rule matches are left as they are.
+    Returns examined/updated counts.
+    """
+    if scope not in ('uncategorized', 'all'):
+        raise ValueError('Invalid scope')
+    start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    matcher = user_rule_matcher(user_id)
+    query = db.session.query(
+        Transaction.id, Transaction.category_id, Transaction.merchant,
+        Transaction.amount_cents, Transaction.description, Transaction.date
+    ).filter(Transaction.user_id == user_id)
+    if scope == 'uncategorized':
+        uncategorized = uncategorized_category()
+        if not uncategorized:
+            return {'examined': 0, 'updated': 0}
+        query = query.filter(Transaction.category_id == uncategorized.id)
+    if transaction_ids is not None:
+        query = query.filter(Transaction.id.in_([int(i) for i in transaction_ids]))
+    if start_date:
+        query = query.filter(Transaction.date >= start_date)
+    if end_date:
+        query = query.filter(Transaction.date <= end_date)
+    
+    table = Transaction.__table__
+    update = table.update().where(table.c.id == db.bindparam('_id')).values(
+        category_id=db.bindparam('_category_id'), merchant=db.bindparam('_merchant')
+    )
+    examined = 0
+    updated = 0
+    last_id = 0
+    while True:
+        # Keyset over id so each batch is an index range scan
+        batch = query.filter(Transaction.id > last_id).order_by(Transaction.id).limit(RULES_APPLY_BATCH).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        examined += len(batch)
+        
+        changes = []
+        rollup = {}
+        for row in batch:
+            rule = matcher.match(row.description, row.amount_cents)
+            if not rule:
+                continue
+            merchant = rule.merchant or row.merchant
+            if rule.category_id == row.category_id and merchant == row.merchant:
+                continue
+            changes.append({'_id': row.id, '_category_id': rule.category_id, '_merchant': merchant})
+            month_start = row.date.replace(day=1)
+            for category_id, sign in ((row.category_id, -1), (rule.category_id, 1)):
+                total, count = rollup.get((category_id, month_start), (0, 0))
+                rollup[(category_id, month_start)] = (total + sign * row.amount_cents, count + sign)
+        
+        if changes:
+            db.session.execute(update, changes)
+            record_changes(db.session.connection(), user_id, 'transaction', 'upsert',
+                           [change['_id'] for change in changes])
+            for (category_id, month_start), (total, count) in rollup.items():
+                if count or total:
+                    update_rollup(user_id, category_id, month_start, total, count)
+            updated += len(changes)
+        db.session.commit()
+        if on_batch:
+            on_batch(examined)
+    return {'examined': examined, 'updated': updated}
+
+def serialize_rule(rule):
+    return {
+        'id': rule.id,
+        'category_id': rule.category_id,
+        'match_type': rule.match_type,
+        'pattern': rule.pattern,
+        'min_amount': None if rule.min_amount_cents is None else cents_to_json(rule.min_amount_cents),
+        'max_amount': None if rule.max_amount_cents is None else cents_to_json(rule.max_amount_cents),
+        'merchant': rule.merchant,
+        'priority': rule.priority
+    }
+
+def update_rule_from_json(rule, data):
+    """Apply request fields to a rule, raising ValueError on invalid values"""
+    if 'category_id' in data:
+        if not category_cache.get(data['category_id']):
+            raise ValueError('Invalid category')
+        rule.category_id = int(data['category_id'])
+    if 'match_type' in data:
+        rule.match_type = data['match_type']
+    if 'pattern' in data:
+        rule.pattern = str(data['pattern'] or '')[:200]
+    for field in ('min_amount', 'max_amount'):
+        if field in data:
+            setattr(rule, f'{field}_cents', None if data[field] in (None, '') else to_cents(data[field]))
+    if 'merchant' in data:
+        rule.merchant = (data['merchant'] or None) and str(data['merchant'])[:100]
+    if 'priority' in data:
+        rule.priority = int(data['priority'])
+    validate_rule(rule.match_type, rule.pattern)
+
+# Recurring transactions
+# Schedules are expanded arithmetically: the occurrence at or after any date
+# is computed directly, so expanding a range costs O(occurrences in range).
+# Due occurrences are written in bulk the first time a user's data is read
+# on a given day, instead of by a cron job writing rows ahead of time.
+RECURRING_FREQUENCIES = {'daily': (1, 0), 'weekly': (7, 0), 'monthly': (0, 1), 'yearly': (0, 12)}
+RECURRING_UPCOMING_MAX_DAYS = 366
+RECURRING_UPCOMING_MAX_ROWS = 1000
+# Rows one catch-up call may write; a schedule started long ago is caught up
+# across several reads instead of in one unbounded insert
+RECURRING_CATCH_UP_MAX_ROWS = 5000
+RECURRING_CATCH_UP_ENDPOINTS = {
+    'dashboard', 'api_transactions', 'api_transactions_search', 'api_export', 'api_budget_progress',
+    'api_spending_by_category', 'api_monthly_summary', 'api_trends', 'api_changes',
+}
+
+def add_months(day, months, month_day):
+    """Date `months` after day's month on month_day, clamped to the month's length"""
+    index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(index, 12)
+    return date(year, month + 1, min(month_day, calendar.monthrange(year, month + 1)[1]))
+
+def occurrence_date(schedule, index):
+    """Date of the schedule's index-th occurrence, counting from 0 at start_date"""
+    days, months = RECURRING_FREQUENCIES[schedule.frequency]
+    if days:
+        return schedule.start_date + timedelta(days=days * schedule.interval * index)
+    return add_months(schedule.start_date, months * schedule.interval * index, schedule.start_date.day)
+
+def first_occurrence_index(schedule, day):
+    """Index of the first occurrence on or after day"""
+    if day <= schedule.start_date:
+        return 0
+    days, months = RECURRING_FREQUENCIES[schedule.frequency]
+    if days:
+        step = days * schedule.interval
+        return -(-(day - schedule.start_date).days // step)
+    elapsed = (day.year - schedule.start_date.year) * 12 + day.month - schedule.start_date.month
+    index = elapsed // (months * schedule.interval)
+    # Clamping to a short month can land the estimate before day
+    while occurrence_date(schedule, index) < day:
+        index += 1
+    return index
+
+def occurrences(schedule, start, end, first_index=None):
+    """Yield (index, date) for occurrences in [start, end] that the schedule allows"""
+    index = first_occurrence_index(schedule, start) if first_index is None else first_index
+    while schedule.count is None or index < schedule.count:
+        day = occurrence_date(schedule, index)
+        if day > end or (schedule.until and day > schedule.until):
+            return
+        if day >= start:
+            yield index, day
+        index += 1
+
+def schedule_next(schedule, index):
+    """(index, date) of the first occurrence from index on, or (index, None) if exhausted"""
+    for index, day in occurrences(schedule, date.min, date.max, first_index=index):
+        return index, day
+    return index, None
+
+def materialize_recurring(schedule, through, limit=RECURRING_CATCH_UP_MAX_ROWS):
+    """Write up to limit of the schedule's unwritten occurrences up to through; returns rows inserted.
+    
+    The schedule row is advanced with a conditional UPDATE first, so when two
+    workers catch up at once only the one that wins the claim inserts rows.
+    """
+    due = list(itertools.islice(
+        occurrences(schedule, date.min, through, first_index=schedule.next_index), limit))
+    if not due:
+        return 0
+    next_index, next_date = schedule_next(schedule, due[-1][0] + 1)
+    table = RecurringTransaction.__table__
+    claimed = db.session.execute(
+        table.update().where(
+            table.c.id == schedule.id, table.c.next_index == schedule.next_index
+        ).values(next_index=next_index, next_date=next_date)
+    ).rowcount
+    if not claimed:
+        return 0
+    
+    now = datetime.utcnow()
+    db.session.execute(Transaction.__table__.insert(), [{
+        'user_id': schedule.user_id,
+        'category_id': schedule.category_id,
+        'amount_cents': schedule.amount_cents,
+        'currency': schedule.currency,
+        'description': schedule.description,
+        'date': day,
+        'created_at': now,
+    } for _, day in due])
+    months = {}
+    for _, day in due:
+        months[day.replace(day=1)] = months.get(day.replace(day=1), 0) + 1
+    for month_start, count in months.items():
+        update_rollup(schedule.user_id, schedule.category_id, month_start, schedule.amount_cents * count, count)
+    record_reset(schedule.user_id, 'transaction')
+    return len(due)
+
+recurring_caught_up = MemoryCacheBackend(10000)
+
+def catch_up_recurring(user_id, today=None):
+    """Materialize due occurrences for a user, at most RECURRING_CATCH_UP_MAX_ROWS per call.
+    
+    A no-op for the rest of the day once nothing is left due; until then each
+    call carries on where the last one stopped.
+    """
+    today = today or date.today()
+    if recurring_caught_up.get(user_id) == today:
+        return 0
+    due = RecurringTransaction.query.filter(
+        RecurringTransaction.user_id == user_id,
+        RecurringTransaction.next_date <= today
+    ).all()
+    inserted = 0
+    for schedule in due:
+        if inserted >= RECURRING_CATCH_UP_MAX_ROWS:
+            break
+        inserted += materialize_recurring(schedule, today, RECURRING_CATCH_UP_MAX_ROWS - inserted)
+    db.session.commit()
+    if inserted < RECURRING_CATCH_UP_MAX_ROWS:
+        recurring_caught_up.set(user_id, today)
+    return inserted
+
+@app.before_request
+def catch_up_recurring_for_reads():
+    # Reads that show transactions or totals first write any due occurrences
+    if request.endpoint in RECURRING_CATCH_UP_ENDPOINTS and current_user.is_authenticated:
+        try:
+            catch_up_recurring(current_user.id)
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('Recurring catch-up failed for user %s', current_user.id)
+
+def parse_rrule(value):
+    """Parse FREQ/INTERVAL/COUNT/UNTIL from an RRULE string into schedule fields"""
+    fields = {}
+    for part in str(value).upper().removeprefix('RRULE:').split(';'):
+        if not part:
+            continue
+        key, _, text = part.partition('=')
+        if key == 'FREQ':
+            fields['frequency'] = text.lower()
+        elif key == 'INTERVAL':
+            fields['interval'] = int(text)
+        elif key == 'COUNT':
+            fields['count'] = int(text)
+        elif key == 'UNTIL':
+            fields['until'] = datetime.strptime(text[:8], '%Y%m%d').date().isoformat()
+        else:
+            raise ValueError(f'Unsupported RRULE part: {key}')
+    return fields
+
+def format_rrule(schedule):
+    parts = [f'FREQ={schedule.frequency.upper()}', f'INTERVAL={schedule.interval}']
+    if schedule.count is not None:
+        parts.append(f'COUNT={schedule.count}')
+    if schedule.until:
+        parts.append(f'UNTIL={schedule.until.strftime("%Y%m%d")}')
+    return ';'.join(parts)
+
+def serialize_recurring(schedule):
+    return {
+        'id': schedule.id,
+        'category_id': schedule.category_id,
+        'amount': cents_to_json(schedule.amount_cents),
+        'amount_cents': schedule.amount_cents,
+        'currency': schedule.currency,
+        'description': schedule.description,
+        'rrule': format_rrule(schedule),
+        'frequency': schedule.frequency,
+        'interval': schedule.interval,
+        'start_date': schedule.start_date.isoformat(),
+        'until': schedule.until.isoformat() if schedule.until else None,
+        'count': schedule.count,
+        'next_date': schedule.next_date.isoformat() if schedule.next_date else None
+    }
+
+def update_recurring_from_json(schedule, data, creating=False):
+    """Apply request fields to a schedule, raising ValueError on invalid values.
+    
+    The cadence (frequency, interval, start_date) is fixed once created so
+    occurrence numbering stays stable; create a new schedule to change it.
+    """
+    if data.get('rrule'):
+        data = dict(parse_rrule(data['rrule']), **{k: v for k, v in data.items() if k != 'rrule'})
+    if creating:
+        if data.get('frequency') not in RECURRING_FREQUENCIES:
+            raise ValueError('Invalid frequency')
+        schedule.frequency = data['frequency']
+        schedule.interval = 1 if data.get('interval') is None else int(data['interval'])
+        if schedule.interval < 1:
+            raise ValueError('Invalid interval')
+        schedule.start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+    if 'category_id' in data:
+        if not category_cache.get(data['category_id']):
+            raise ValueError('Invalid category')
+        schedule.category_id = int(data['category_id'])
+    if 'amount' in data:
+        schedule.amount_cents = to_cents(data['amount'])
+    if 'currency' in data or creating:
+        schedule.currency = parse_currency(data.get('currency'))
+    if 'description' in data:
+        schedule.description = (data['description'] or '')[:200]
+    if 'until' in data:
+        schedule.until = datetime.strptime(data['until'], '%Y-%m-%d').date() if data['until'] else None
+    if 'count' in data:
+        schedule.count = int(data['count']) if data['count'] is not None else None
+        if schedule.count is not None and schedule.count < 1:
+            raise ValueError('Invalid count')
+    # Bounds may have moved; recompute the next unwritten occurrence
+    schedule.next_index, schedule.next_date = schedule_next(schedule, schedule.next_index or 0)
+
+# Background jobs
+# Handlers return (result, mimetype). result is either bytes, stored on the
+# Job row, or an iterable of byte chunks, stored as JobResultChunk rows of
+# about JOB_RESULT_CHUNK_BYTES so large results never sit in memory whole.
+JOB_RESULT_CHUNK_BYTES = 1024 * 1024
+
+def run_export_job(job, params, report):
+    fmt = params.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError('Unsupported export format')
+    query = filtered_transactions_query(job.user_id, params)
+    total = query.order_by(None).count() or 1
+    
+    def rows():
+        for i, row in enumerate(query.yield_per(TRANSACTIONS_STREAM_BATCH), start=1):
+            if i % TRANSACTIONS_STREAM_BATCH == 0:
+                report(i / total)
+            yield row
+    
+    writer, mimetype = EXPORT_FORMATS[fmt]
+    return writer(rows()), mimetype
+
+def store_job_result(job_id, chunks):
+    """Write an iterable of byte chunks as JobResultChunk rows in the current transaction"""
+    table = JobResultChunk.__table__
+    seq = 0
+    pending = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= JOB_RESULT_CHUNK_BYTES:
+            db.session.execute(table.insert().values(job_id=job_id, seq=seq, data=b''.join(pending)))
+            seq += 1
+            pending = []
+            size = 0
+    if pending or seq == 0:
+        db.session.execute(table.insert().values(job_id=job_id, seq=seq, data=b''.join(pending)))
+
+def iter_job_result(job_id):
+    """Yield a chunked job result one stored chunk at a time"""
+    seq = 0
+    while True:
+        data = db.session.query(JobResultChunk.data).filter_by(job_id=job_id, seq=seq).scalar()
+        if data is None:
+            return
+        yield data
+        seq += 1
+
+def run_import_job(job, params, report):
+    stream = io.BytesIO(job.input or b'')
+    size = len(job.input or b'') or 1
+    result = import_transactions(
+        job.user_id, params.get('format'), stream, params.get('category_id'),
+        on_batch=lambda: report(stream.tell() / size)
+    )
+    return app.json.dumps(result).encode(), 'application/json'
+
+def run_rebuild_rollups_job(job, params, report):
+    rebuild_rollups(job.user_id)
+    return app.json.dumps({'message': 'Monthly rollups rebuilt'}).encode(), 'application/json'
+
+def run_apply_rules_job(job, params, report):
+    total = Transaction.query.filter_by(user_id=job.user_id).count() or 1
+    result = apply_rules(
+        job.user_id, params.get('transaction_ids'), params.get('scope', 'uncategorized'),
+        params.get('start_date'), params.get('end_date'),
+        on_batch=lambda examined: report(examined / total)
+    )
+    return app.json.dumps(result).encode(), 'application/json'
+
+def run_trends_job(job, params, report):
+    trends = user_trends(job.user_id, date.today())
+    return app.json.dumps({
+        'categories': len(trends['category_ids']),
+        'months': trends['totals'].shape[1]
+    }).encode(), 'application/json'
+
+JOB_HANDLERS = {
+    'export': run_export_job,
+    'import': run_import_job,
+    'rebuild_rollups': run_rebuild_rollups_job,
+    'apply_rules': run_apply_rules_job,
+    'trends': run_trends_job,
+}
+
+class JobRunner:
+    """Executes queued Job rows on a thread pool inside the web process.
+    
+    A dispatcher thread claims queued jobs with a conditional UPDATE, so
+    several worker processes can share one table without running a job
+    twice, and enforces the per-user running limit. With shards, each
+    shard's table is polled in turn and jobs are keyed by (shard, job id). It also records
+    progress and heartbeats for its jobs through a separate connection,
+    requeues jobs whose heartbeat went stale because their worker died, and
+    prunes the change feed once an hour.
+    """
+    
+    def __init__(self):
+        self.name = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.progress = {}
+        self.pruned_at = {}
+        self.thread = None
+        self.executor = None
+    
+    def start(self):
+        with self.lock:
+            # Also restarts after fork, where the parent's threads do not exist
+            if self.thread and self.thread.is_alive():
+                return
+            from concurrent.futures import ThreadPoolExecutor
+            self.name = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+            self.progress = {}
+            self.executor = ThreadPoolExecutor(app.config['JOB_WORKERS'], thread_name_prefix='job')
+            self.thread = threading.Thread(target=self.run, name='job-dispatcher', daemon=True)
+            self.thread.start()
+    
+    def notify(self):
+        self.wake.set()
+    
+    def run(self):
+        while True:
+            for shard in database_router.contexts():
+                try:
+                    with app.app_context(), using_shard(shard):
+                        self.heartbeat(shard)
+                        self.recover_stale()
+                        self.dispatch(shard)
+                        self.prune(shard)
+                except OperationalError as e:
+                    # Usually a busy database (e.g. SQLite locked by an import); retry next poll
+                    app.logger.warning('Job dispatcher skipped a poll: %s', e.orig or e)
+                except Exception as e:
+                    app.logger.exception('Job dispatcher error: %s', e)
+            self.wake.wait(app.config['JOB_POLL_SECONDS'])
+            self.wake.clear()
+    
+    def heartbeat(self, shard):
+        table = Job.__table__
+        now = datetime.utcnow()
+        for (job_shard, job_id), fraction in list(self.progress.items()):
+            if job_shard != shard:
+                continue
+            db.session.execute(table.update().where(
+                table.c.id == job_id, table.c.worker == self.name, table.c.status == 'running'
+            ).values(heartbeat_at=now, progress=int(fraction * 100)))
+        db.session.commit()
+    
+    def recover_stale(self):
+        table = Job.__table__
+        cutoff = datetime.utcnow() - timedelta(seconds=app.config['JOB_STALE_SECONDS'])
+        stale = (table.c.status == 'running', table.c.heartbeat_at < cutoff)
+        # Runs every poll: only take the write lock when there is something to requeue
+        if db.session.execute(db.select(table.c.id).where(*stale).limit(1)).first() is None:
+            return
+        result = db.session.execute(table.update().where(*stale).values(
+            status='queued', worker=None, progress=0))
+        db.session.commit()
+        if result.rowcount:
+            app.logger.warning('Requeued %d stale jobs', result.rowcount)
+    
+    def prune(self, shard):
+        """Trim the change feed at most once per CHANGES_PRUNE_INTERVAL seconds"""
+        now = time.monotonic()
+        if now - self.pruned_at.get(shard, float('-inf')) < CHANGES_PRUNE_INTERVAL:
+            return
+        self.pruned_at[shard] = now
+        deleted = prune_change_log()
+        if deleted:
+            app.logger.info('Pruned %d change feed entries', deleted)
+    
+    def dispatch(self, shard):
+        free = app.config['JOB_WORKERS'] - len(self.progress)
+        if free <= 0:
+            return
+        running = dict(db.session.query(Job.user_id, db.func.count(Job.id)).filter(
+            Job.status == 'running'
+        ).group_by(Job.user_id).all())
+        queued = db.session.query(Job.id, Job.user_id).filter(
+            Job.status == 'queued'
+        ).order_by(Job.id).limit(100).all()
+        
+        table = Job.__table__
+        for job_id, user_id in queued:
+            if free <= 0:
+                break
+            if running.get(user_id, 0) >= app.config['JOB_USER_CONCURRENCY']:
+                continue
+            now = datetime.utcnow()
+            claimed = db.session.execute(table.update().where(
+                table.c.id == job_id, table.c.status == 'queued'
+            ).values(status='running', worker=self.name, started_at=now, heartbeat_at=now)).rowcount
+            db.session.commit()
+            if claimed:
+                running[user_id] = running.get(user_id, 0) + 1
+                free -= 1
+                self.progress[(shard, job_id)] = 0.0
+                self.executor.submit(self.execute, shard, job_id)
+    
+    def execute(self, shard, job_id):
+        try:
+            with app.app_context(), using_shard(shard):
+                job = db.session.get(Job, job_id)
+                params = json.loads(job.params or '{}')
+                
+                def report(fraction):
+                    self.progress[(shard, job_id)] = min(max(fraction, 0.0), 1.0)
+                
+                try:
+                    result, mimetype = JOB_HANDLERS[job.kind](job, params, report)
+                    if not isinstance(result, bytes):
+                        # Chunks go in with the status update, so a failed job leaves none behind
+                        store_job_result(job_id, result)
+                        result = None
+                except Exception as e:
+                    db.session.rollback()
+                    job = db.session.get(Job, job_id)
+                    job.status = 'failed'
+                    job.error = str(e)[:500] or e.__class__.__name__
+                else:
+                    job.status = 'succeeded'
+                    job.progress = 100
+                    job.result = result
+                    job.result_mimetype = mimetype
+                job.input = None
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+        except Exception as e:
+            app.logger.exception('Job %s crashed: %s', job_id, e)
+        finally:
+            self.progress.pop((shard, job_id), None)
+            self.notify()
+    
+    def current_progress(self, job_id):
+        """Live progress (0-100) for a job of the current shard running in this process, if any"""
+        fraction = self.progress.get((current_shard(), job_id))
+        return None if fraction is None else int(fraction * 100)
+
+job_runner = JobRunner()
+
+@app.before_request
+def ensure_job_runner():
+    # Started lazily so CLI commands and the gunicorn master don't spawn threads
+    job_runner.start()
+
+def serialize_job(job):
+    live = job_runner.current_progress(job.id) if job.status == 'running' else None
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': live if live is not None else job.progress,
+        'error': job.error,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'result_url': url_for('api_job_result', job_id=job.id) if job.status == 'succeeded' else None
+    }
+
+# Static assets
+# Files under static/ are read once, gzipped once and kept in memory. URLs
+# built with url_for('static', ...) carry a content fingerprint (?v=), so
+# browsers can cache them for a year and still see every change.
+STATIC_FOLDER = os.path.join(app.root_path, 'static')
+STATIC_MAX_AGE = 365 * 24 * 3600
+STATIC_COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+StaticAsset = namedtuple('StaticAsset', ['body', 'gzip', 'etag', 'mimetype'])
+
+static_assets = {}
+
+def load_static_asset(filename):
+    """Cached StaticAsset for a path under static/, or None if there is no such file"""
+    asset = static_assets.get(filename)
+    if asset is not None:
+        return asset
+    path = safe_join(STATIC_FOLDER, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    with open(path, 'rb') as f:
+        body = f.read()
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    compressed = None
+    if mimetype.startswith(STATIC_COMPRESSIBLE):
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) >= len(body):
+            compressed = None
+    asset = StaticAsset(body, compressed, hashlib.sha1(body).hexdigest()[:12], mimetype)
+    # Re-read on every request while debugging so edits show up immediately
+    if not app.debug:
+        static_assets[filename] = asset
+    return asset
+
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    if endpoint == 'static' and 'v' not in values:
+        asset = load_static_asset(values.get('filename', ''))
+        if asset is not None:
+            values['v'] = asset.etag
+
+@app.route('/static/<path:filename>', endpoint='static')
+def static_file(filename):
+    asset = load_static_asset(filename)
+    if asset is None:
+        abort(404)
+    
+    use_gzip = asset.gzip is not None and bool(request.accept_encodings['gzip'])
+    response = Response(asset.gzip if use_gzip else asset.body, mimetype=asset.mimetype)
+    if asset.gzip is not None:
+        response.vary.add('Accept-Encoding')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    # Each encoding is a different representation, so it gets its own ETag
+    response.set_etag(asset.etag + ('-gzip' if use_gzip else ''))
+    if request.args.get('v') == asset.etag:
+        response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+    else:
+        response.headers['Cache-Control'] = 'public, no-cache'
+    return response.make_conditional(request)
+
+# Template helpers
+@app.template_filter('display_date')
+def display_date(value):
+    """Render an ISO date string (as found in JSON payloads) like 'Jan 05, 2026'"""
+    return date.fromisoformat(value).strftime('%b %d, %Y')
 
 # Routes
 @app.route('/')
@@ -112,9 +2192,14 @@ def register():
         
         # Create new user
         user = User(username=username, email=email)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except PasswordHasherBusy:
+            flash('The server is busy. Please try again in a moment.')
+            return render_template('register.html'), 503
         db.session.add(user)
         db.session.commit()
+        copy_user_to_shard(user)
         
         flash('Registration successful! Please log in.')
         return redirect(url_for('login'))
@@ -129,7 +2214,21 @@ def login():
         
         user = User.query.filter_by(username=username).first()
         
-        if user and user.check_password(password):
+        try:
+            authenticated = user is not None and user.check_password(password)
+        except PasswordHasherBusy:
+            flash('The server is busy. Please try again in a moment.')
+            return render_template('login.html'), 503
+        
+        if authenticated:
+            if password_hasher.needs_rehash(user.password_hash):
+                # Upgrade to the configured hash while the plaintext is at hand;
+                # if the pool is busy, a later login will do it
+                try:
+                    user.set_password(password)
+                    db.session.commit()
+                except PasswordHasherBusy:
+                    pass
             login_user(user)
             next_page = request.args.get('next')
             return redirect(next_page) if next_page else redirect(url_for('dashboard'))
@@ -145,35 +2244,65 @@ def logout():
     flash('You have been logged out.')
     return redirect(url_for('index'))
 
+DASHBOARD_RECENT_TRANSACTIONS = 5
+
+def dashboard_payload(user_id, today):
+    """Everything the dashboard shows on first paint, in two queries.
+    
+    The month's rollup rows give both the summary and the expense breakdown;
+    category names, types and colors come from the in-memory category cache.
+    """
+    rows = db.session.query(
+        MonthlyRollup.category_id,
+        MonthlyRollup.total_cents,
+        MonthlyRollup.count
+    ).filter(
+        MonthlyRollup.user_id == user_id,
+        MonthlyRollup.year == today.year,
+        MonthlyRollup.month == today.month,
+        MonthlyRollup.count > 0
+    ).all()
+    
+    income = expenses = count = 0
+    spending = []
+    for row in rows:
+        category = category_cache.get(row.category_id)
+        count += row.count
+        if category.type == 'income':
+            income += row.total_cents
+        else:
+            expenses += row.total_cents
+            spending.append({
+                'category': category.name,
+                'amount': cents_to_json(row.total_cents),
+                'color': category.color
+            })
+    spending.sort(key=lambda item: -item['amount'])
+    
+    recent = transaction_rows(user_id).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).limit(DASHBOARD_RECENT_TRANSACTIONS).all()
+    
+    return {
+        'summary': {
+            'month': today.month,
+            'year': today.year,
+            'income': cents_to_json(income),
+            'expenses': cents_to_json(expenses),
+            'balance': cents_to_json(income - expenses),
+            'transaction_count': count
+        },
+        'spending_by_category': spending,
+        'recent_transactions': [serialize_transaction(r) for r in recent]
+    }
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    # Get user's recent transactions
-    recent_transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.date.desc()).limit(5).all()
-    
-    # Calculate basic stats
-    current_month = datetime.now().month
-    current_year = datetime.now().year
-    
-    monthly_income = db.session.query(db.func.sum(Transaction.amount)).join(Category).filter(
-        Transaction.user_id == current_user.id,
-        Category.type == 'income',
-        db.extract('month', Transaction.date) == current_month,
-        db.extract('year', Transaction.date) == current_year
-    ).scalar() or 0
-    
-    monthly_expenses = db.session.query(db.func.sum(Transaction.amount)).join(Category).filter(
-        Transaction.user_id == current_user.id,
-        Category.type == 'expense',
-        db.extract('month', Transaction.date) == current_month,
-        db.extract('year', Transaction.date) == current_year
-    ).scalar() or 0
-    
-    return render_template('dashboard.html', 
-                         transactions=recent_transactions,
-                         monthly_income=monthly_income,
-                         monthly_expenses=monthly_expenses,
-                         balance=monthly_income - monthly_expenses)
+    # Summary, chart data and recent transactions are embedded in the page,
+    # so first paint needs no follow-up API requests
+    payload = dashboard_payload(current_user.id, date.today())
+    return render_template('dashboard.html', payload=payload)
 
 @app.route('/transactions')
 @login_required
@@ -189,57 +2318,135 @@ def budgets():
 # REST API ENDPOINTS
 # ===============================
 
+TRANSACTIONS_PAGE_SIZE = 50
+TRANSACTIONS_MAX_PAGE_SIZE = 500
+TRANSACTIONS_STREAM_BATCH = 500
+
+def encode_cursor(date, transaction_id):
+    """Encode a (date, id) keyset position as an opaque cursor string"""
+    raw = f'{date.isoformat()}|{transaction_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        date_part, id_part = raw.split('|')
+    except Exception:
+        raise ValueError('Invalid cursor')
+    return datetime.strptime(date_part, '%Y-%m-%d').date(), int(id_part)
+
+def apply_transaction_filters(query, args):
+    """Narrow a transaction_rows() query by the listing's request filters"""
+    if args.get('start_date'):
+        query = query.filter(Transaction.date >= datetime.strptime(args['start_date'], '%Y-%m-%d').date())
+    if args.get('end_date'):
+        query = query.filter(Transaction.date <= datetime.strptime(args['end_date'], '%Y-%m-%d').date())
+    if args.get('category_id'):
+        query = query.filter(Transaction.category_id == int(args['category_id']))
+    if args.get('type'):
+        if args['type'] not in ('income', 'expense'):
+            raise ValueError('Invalid type')
+        query = query.filter(Category.type == args['type'])
+    if args.get('min_amount'):
+        query = query.filter(Transaction.amount_cents >= to_cents(args['min_amount']))
+    if args.get('max_amount'):
+        query = query.filter(Transaction.amount_cents <= to_cents(args['max_amount']))
+    return query
+
+def filtered_transactions_query(user_id, args):
+    """Build the transaction listing query from request filters, newest first"""
+    query = apply_transaction_filters(transaction_rows(user_id), args)
+    
+    # Keyset pagination: continue strictly after the last (date, id) seen
+    if args.get('cursor'):
+        cursor_date, cursor_id = decode_cursor(args['cursor'])
+        query = query.filter(db.tuple_(Transaction.date, Transaction.id) < db.tuple_(cursor_date, cursor_id))
+    
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc())
+
 @app.route('/api/transactions', methods=['GET', 'POST'])
 @login_required
 def api_transactions():
     if request.method == 'GET':
-        # Get all transactions for current user
-        transactions = Transaction.query.filter_by(user_id=current_user.id).order_by(Transaction.date.desc()).all()
-        return jsonify([{
-            'id': t.id,
-            'amount': t.amount,
-            'description': t.description,
-            'date': t.date.isoformat(),
-            'category_id': t.category_id,
-            'category_name': t.category.name,
-            'category_type': t.category.type,
-            'category_color': t.category.color
-        } for t in transactions])
+        try:
+            # Read before the rows, so a client syncing from it can only see changes twice, never miss one
+            seq = current_change_seq(current_user.id)
+            query = filtered_transactions_query(current_user.id, request.args)
+            limit = request.args.get('limit', TRANSACTIONS_PAGE_SIZE, type=int)
+        except ValueError as e:
+            return jsonify({'error': 'Invalid data format'}), 400
+        
+        # Opt-in NDJSON streaming: rows are fetched in batches from a
+        # server-side cursor so memory stays flat for large histories
+        if request.args.get('format') == 'ndjson':
+            if 'limit' in request.args:
+                query = query.limit(max(limit, 0))
+            
+            def generate():
+                for row in query.yield_per(TRANSACTIONS_STREAM_BATCH):
+                    yield json.dumps(serialize_transaction(row)) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        limit = min(max(limit, 1), TRANSACTIONS_MAX_PAGE_SIZE)
+        # Fetch one extra row to know whether another page exists
+        transactions = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(transactions) > limit:
+            transactions = transactions[:limit]
+            last = transactions[-1]
+            next_cursor = encode_cursor(last.date, last.id)
+        
+        response = jsonify({
+            'transactions': [serialize_transaction(t) for t in transactions],
+            'next_cursor': next_cursor
+        })
+        response.headers['X-Change-Seq'] = str(seq)
+        return response
     
     elif request.method == 'POST':
         try:
             data = request.get_json()
             
             # Validate required fields
-            if not all(key in data for key in ['category_id', 'amount', 'date']):
+            if not all(key in data for key in ['amount', 'date']):
                 return jsonify({'error': 'Missing required fields'}), 400
             
-            # Verify category belongs to valid categories
-            category = Category.query.get(data['category_id'])
+            amount_cents = to_cents(data['amount'])
+            description = data.get('description', '')
+            merchant = None
+            if data.get('category_id') is None:
+                # No explicit category: the user's rules decide, else Uncategorized
+                rule = user_rule_matcher(current_user.id).match(description, amount_cents)
+                category = category_cache.get(rule.category_id) if rule else uncategorized_category()
+                merchant = rule.merchant if rule else None
+            else:
+                # Verify category belongs to valid categories
+                category = category_cache.get(data['category_id'])
             if not category:
                 return jsonify({'error': 'Invalid category'}), 400
             
             # Create new transaction
             transaction = Transaction(
                 user_id=current_user.id,
-                category_id=data['category_id'],
-                amount=float(data['amount']),
-                description=data.get('description', ''),
+                category_id=category.id,
+                amount_cents=amount_cents,
+                currency=parse_currency(data.get('currency')),
+                description=description,
+                merchant=merchant,
                 date=datetime.strptime(data['date'], '%Y-%m-%d').date()
             )
             
             db.session.add(transaction)
+            rollup_add(transaction)
             db.session.commit()
             
             return jsonify({
                 'message': 'Transaction created successfully',
-                'transaction': {
-                    'id': transaction.id,
-                    'amount': transaction.amount,
-                    'description': transaction.description,
-                    'date': transaction.date.isoformat(),
-                    'category_name': transaction.category.name
-                }
+                'transaction': serialize_transaction(
+                    transaction_rows(current_user.id).filter(Transaction.id == transaction.id).one()
+                )
             }), 201
             
         except ValueError as e:
@@ -248,38 +2455,605 @@ def api_transactions():
             db.session.rollback()
             return jsonify({'error': 'Failed to create transaction'}), 500
 
+# Full-text search
+# SQLite keeps a contentless FTS5 table in sync through triggers; Postgres
+# uses a generated tsvector column with a GIN index. Each FTS5 row also
+# indexes a per-user token so MATCH only ever visits the caller's rows.
+SEARCH_MAX_TERMS = 8
+SEARCH_TERM = re.compile(r'\w+')
+
+def search_terms(text):
+    """Word tokens of a search string; the last one is matched as a prefix"""
+    terms = SEARCH_TERM.findall((text or '').lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise ValueError('Empty search')
+    return terms
+
+def search_subquery(user_id, terms):
+    """(id, score) for the user's matching transactions; lower score ranks first"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        phrases = [f'"{term}"' for term in terms]
+        phrases[-1] += '*'
+        # bm25 weights: ignore the user token column, rank on description
+        statement = db.text(
+            'SELECT rowid AS id, bm25(transaction_fts, 0.0, 1.0) AS score FROM transaction_fts '
+            'WHERE transaction_fts MATCH :match'
+        ).bindparams(match=f'user_key : u{int(user_id)} AND description : ({" ".join(phrases)})')
+    elif dialect == 'postgresql':
+        statement = db.text(
+            'SELECT id, -ts_rank(search_vector, query) AS score '
+            'FROM "transaction", to_tsquery(\'simple\', :query) AS query '
+            'WHERE user_id = :user_id AND search_vector @@ query'
+        ).bindparams(query=' & '.join(terms) + ':*', user_id=user_id)
+    else:
+        # No index: substring match on every term, newest first by id
+        return db.session.query(
+            Transaction.id.label('id'),
+            (-Transaction.id).label('score')
+        ).filter(
+            Transaction.user_id == user_id,
+            *[Transaction.description.ilike(f'%{term}%') for term in terms]
+        ).subquery('search')
+    return statement.columns(id=db.Integer, score=db.Float).subquery('search')
+
+def encode_search_cursor(score, transaction_id):
+    """Encode a (score, id) keyset position as an opaque cursor string"""
+    raw = f'{score!r}|{transaction_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_search_cursor(cursor):
+    """Decode a cursor produced by encode_search_cursor, raising ValueError if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        score_part, id_part = raw.split('|')
+        return float(score_part), int(id_part)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def ensure_search_index():
+    """Create the dialect's full-text index and its sync hooks, backfilling on first run"""
+    engine = primary_engine()
+    dialect = engine.dialect.name
+    if dialect == 'sqlite':
+        with engine.begin() as connection:
+            exists = connection.execute(db.text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transaction_fts'"
+            )).first()
+            if exists:
+                return
+            connection.execute(db.text(
+                "CREATE VIRTUAL TABLE transaction_fts USING fts5("
+                "user_key, description, content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+            ))
+            # Contentless FTS5 rows are removed with the 'delete' command and the old values
+            connection.execute(db.text(
+                'CREATE TRIGGER IF NOT EXISTS transaction_fts_insert AFTER INSERT ON "transaction" BEGIN '
+                "INSERT INTO transaction_fts(rowid, user_key, description) "
+                "VALUES (new.id, 'u' || new.user_id, coalesce(new.description, '')); END"
+            ))
+            connection.execute(db.text(
+                'CREATE TRIGGER IF NOT EXISTS transaction_fts_delete AFTER DELETE ON "transaction" BEGIN '
+                "INSERT INTO transaction_fts(transaction_fts, rowid, user_key, description) "
+                "VALUES ('delete', old.id, 'u' || old.user_id, coalesce(old.description, '')); END"
+            ))
+            connection.execute(db.text(
+                'CREATE TRIGGER IF NOT EXISTS transaction_fts_update '
+                'AFTER UPDATE OF user_id, description ON "transaction" BEGIN '
+                "INSERT INTO transaction_fts(transaction_fts, rowid, user_key, description) "
+                "VALUES ('delete', old.id, 'u' || old.user_id, coalesce(old.description, '')); "
+                "INSERT INTO transaction_fts(rowid, user_key, description) "
+                "VALUES (new.id, 'u' || new.user_id, coalesce(new.description, '')); END"
+            ))
+            connection.execute(db.text(
+                "INSERT INTO transaction_fts(rowid, user_key, description) "
+                "SELECT id, 'u' || user_id, coalesce(description, '') FROM \"transaction\""
+            ))
+    elif dialect == 'postgresql':
+        columns = {c['name'] for c in db.inspect(engine).get_columns(Transaction.__tablename__)}
+        with engine.begin() as connection:
+            if 'search_vector' not in columns:
+                connection.execute(db.text(
+                    'ALTER TABLE "transaction" ADD COLUMN search_vector tsvector GENERATED ALWAYS AS '
+                    "(to_tsvector('simple', coalesce(description, ''))) STORED"
+                ))
+            connection.execute(db.text(
+                'CREATE INDEX IF NOT EXISTS ix_transaction_search ON "transaction" USING gin (search_vector)'
+            ))
+
+@app.route('/api/transactions/search')
+@login_required
+def api_transactions_search():
+    """Ranked full-text search over descriptions, paginated by (score, id) cursors.
+    
+    Accepts the same filters as GET /api/transactions alongside q.
+    """
+    try:
+        search = search_subquery(current_user.id, search_terms(request.args.get('q')))
+        query = apply_transaction_filters(
+            transaction_rows(current_user.id).join(search, search.c.id == Transaction.id).add_columns(search.c.score),
+            request.args
+        )
+        if request.args.get('cursor'):
+            cursor_score, cursor_id = decode_search_cursor(request.args['cursor'])
+            query = query.filter(db.or_(
+                search.c.score > cursor_score,
+                db.and_(search.c.score == cursor_score, Transaction.id > cursor_id)
+            ))
+        limit = min(max(request.args.get('limit', TRANSACTIONS_PAGE_SIZE, type=int), 1), TRANSACTIONS_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'error': 'Invalid data format'}), 400
+    
+    # Fetch one extra row to know whether another page exists
+    results = query.order_by(search.c.score, Transaction.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(results) > limit:
+        results = results[:limit]
+        last = results[-1]
+        next_cursor = encode_search_cursor(last.score, last.id)
+    
+    return jsonify({
+        'transactions': [serialize_transaction(r) for r in results],
+        'next_cursor': next_cursor
+    })
+
+BULK_BATCH_SIZE = 1000
+BULK_MAX_ERRORS = 100
+BULK_DEDUP_DAYS_PER_QUERY = 500
+BULK_FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'text/csv': 'csv',
+    'application/x-ofx': 'ofx',
+    'application/ofx': 'ofx',
+}
+OFX_TAG = re.compile(r'<(\w+)>([^<\r\n]*)')
+
+def transaction_hash(day, amount_cents, description):
+    """Fingerprint used to detect re-imported transactions"""
+    raw = f'{day.isoformat()}|{int(amount_cents)}|{(description or "").strip()}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def parse_ofx(lines):
+    """Yield transactions from OFX (SGML or XML) statement lines"""
+    current = None
+    for line in lines:
+        for tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if current:
+                    yield current
+                current = {}
+            elif current is not None and tag in ('DTPOSTED', 'TRNAMT', 'NAME', 'MEMO'):
+                current[tag] = value.strip()
+        if current is not None and '</STMTTRN>' in line.upper():
+            yield current
+            current = None
+    if current:
+        yield current
+
+def iter_json_array(text, chunk_size=64 * 1024):
+    """Yield the elements of a top-level JSON array, reading text in chunks.
+    
+    Only the element being decoded is held in memory; raises ValueError if
+    the document is not a well-formed array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+    
+    def next_char():
+        # Skip whitespace, reading more as needed; '' at end of input
+        nonlocal buffer, position, eof
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or eof:
+                return buffer[position:position + 1]
+            buffer, position = text.read(chunk_size), 0
+            eof = not buffer
+    
+    if next_char() != '[':
+        raise ValueError('Expected a JSON array')
+    position += 1
+    if next_char() == ']':
+        return
+    while True:
+        next_char()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # A number is only complete once a character that cannot continue it has been read
+            if end is not None and (eof or (end < len(buffer) and buffer[end] not in '0123456789.eE+-')):
+                break
+            chunk = text.read(chunk_size)
+            if not chunk:
+                if end is None:
+                    raise ValueError('Malformed JSON array')
+                eof = True
+                break
+            buffer, position = buffer[position:] + chunk, 0
+        yield value
+        buffer, position = buffer[end:], 0
+        separator = next_char()
+        position += 1
+        if separator == ']':
+            if next_char():
+                raise ValueError('Unexpected data after JSON array')
+            return
+        if separator != ',':
+            raise ValueError('Malformed JSON array')
+
+def ofx_date(value):
+    """OFX YYYYMMDD[HHMMSS...] as YYYY-MM-DD; anything else is passed on for normalize_bulk_row to reject"""
+    day = value[:8]
+    return f'{day[:4]}-{day[4:6]}-{day[6:]}' if len(day) == 8 and day.isdigit() else value
+
+def iter_bulk_rows(fmt, stream):
+    """Yield raw rows from an uploaded byte stream without buffering it whole"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'json':
+            yield from iter_json_array(text)
+        elif fmt == 'ndjson':
+            # Lines are decoded individually so one bad line is a row error
+            yield from (line for line in text if line.strip())
+        elif fmt == 'csv':
+            yield from csv.DictReader(text)
+        elif fmt == 'ofx':
+            for t in parse_ofx(text):
+                # Kept as text so normalize_bulk_row parses it exactly
+                amount = (t.get('TRNAMT') or '').strip()
+                yield {
+                    'date': ofx_date(t.get('DTPOSTED', '')),
+                    'amount': amount.lstrip('+-'),
+                    'description': t.get('NAME') or t.get('MEMO', ''),
+                    'type': 'expense' if amount.startswith('-') else 'income'
+                }
+    finally:
+        # Leave the caller's stream open
+        text.detach()
+
+def normalize_bulk_row(raw, categories, categories_by_name, default_category_id, matcher=None):
+    """Validate one imported row against the in-memory category map.
+    
+    Rows without a category are categorized by matcher's rules, then fall
+    back to default_category_id and finally Uncategorized.
+    """
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    if not isinstance(raw, dict):
+        raise ValueError('Expected an object')
+    
+    if not raw.get('date') or raw.get('amount') in (None, ''):
+        raise ValueError('Missing required fields')
+    amount_cents = to_cents(raw['amount'])
+    description = (raw.get('description') or '')[:200]
+    merchant = None
+    
+    category_id = raw.get('category_id') or None
+    if category_id is None and raw.get('category'):
+        category = categories_by_name.get(str(raw['category']).strip().lower())
+        category_id = category.id if category else -1
+    if category_id is None and matcher:
+        rule = matcher.match(description, amount_cents, raw.get('type'))
+        if rule:
+            category_id, merchant = rule.category_id, rule.merchant
+    if category_id is None:
+        category_id = default_category_id
+    if category_id is None:
+        uncategorized = categories_by_name.get(UNCATEGORIZED.lower())
+        if not uncategorized or (raw.get('type') and raw['type'] != uncategorized.type):
+            raise ValueError('Missing category')
+        category_id = uncategorized.id
+    category = categories.get(int(category_id))
+    if not category:
+        raise ValueError('Invalid category')
+    if raw.get('type') and raw['type'] != category.type:
+        raise ValueError(f"Category is not an {raw['type']} category")
+    
+    return {
+        'category_id': category.id,
+        'amount_cents': amount_cents,
+        'currency': parse_currency(raw.get('currency')),
+        'description': description,
+        'merchant': merchant,
+        'date': datetime.strptime(str(raw['date']).strip(), '%Y-%m-%d').date()
+    }
+
+def insert_bulk_batch(user_id, batch, seen_hashes, fetched_days):
+    """Insert one batch with executemany, skipping duplicates; returns rows inserted.
+    
+    Stored rows are hashed once per date per import: dates in fetched_days
+    are already covered by seen_hashes, as are rows this import inserted.
+    """
+    days = sorted({row['date'] for row in batch} - fetched_days)
+    for start in range(0, len(days), BULK_DEDUP_DAYS_PER_QUERY):
+        chunk = days[start:start + BULK_DEDUP_DAYS_PER_QUERY]
+        existing = db.session.query(Transaction.date, Transaction.amount_cents, Transaction.description).filter(
+            Transaction.user_id == user_id,
+            Transaction.date.in_(chunk)
+        )
+        seen_hashes.update(transaction_hash(*row) for row in existing)
+    fetched_days.update(days)
+    
+    rows = []
+    rollup = {}
+    for row in batch:
+        fingerprint = transaction_hash(row['date'], row['amount_cents'], row['description'])
+        if fingerprint in seen_hashes:
+            continue
+        seen_hashes.add(fingerprint)
+        rows.append(dict(row, user_id=user_id, created_at=datetime.utcnow()))
+        key = (row['category_id'], row['date'].replace(day=1))
+        total, count = rollup.get(key, (0, 0))
+        rollup[key] = (total + row['amount_cents'], count + 1)
+    
+    if rows:
+        db.session.execute(Transaction.__table__.insert(), rows)
+        for (category_id, month_start), (total, count) in rollup.items():
+            update_rollup(user_id, category_id, month_start, total, count)
+    return len(rows)
+
+def import_transactions(user_id, fmt, stream, default_category_id=None, on_batch=None):
+    """Parse, validate and insert an import stream in one database transaction.
+    
+    Commits on success and returns counts plus per-row errors; raises
+    ValueError if the stream itself is malformed. on_batch, if given, is
+    called after each inserted batch.
+    """
+    category_cache.refresh()
+    categories = category_cache.by_id
+    categories_by_name = category_cache.by_name
+    matcher = user_rule_matcher(user_id)
+    
+    imported = 0
+    duplicates = 0
+    errors = []
+    seen_hashes = set()
+    fetched_days = set()
+    batch = []
+    
+    def flush():
+        nonlocal imported, duplicates
+        inserted = insert_bulk_batch(user_id, batch, seen_hashes, fetched_days)
+        imported += inserted
+        duplicates += len(batch) - inserted
+        batch.clear()
+        if on_batch:
+            on_batch()
+    
+    for line_number, raw in enumerate(iter_bulk_rows(fmt, stream), start=1):
+        try:
+            batch.append(normalize_bulk_row(raw, categories, categories_by_name, default_category_id, matcher))
+        except (KeyError, TypeError, ValueError) as e:
+            if len(errors) < BULK_MAX_ERRORS:
+                errors.append({'row': line_number, 'error': str(e)})
+            continue
+        if len(batch) >= BULK_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    
+    if imported:
+        record_reset(user_id, 'transaction')
+    db.session.commit()
+    return {'imported': imported, 'duplicates': duplicates, 'errors': errors}
+
+@app.route('/api/transactions/bulk', methods=['POST'])
+@login_required
+def api_transactions_bulk():
+    """Import many transactions from a JSON array, NDJSON, CSV or OFX upload.
+    
+    The body may be sent raw (format from Content-Type or ?format=) or as a
+    multipart upload in the "file" field. Valid rows are inserted in batches
+    inside one database transaction; invalid rows are reported by row number
+    and rows matching an existing (date, amount, description) are skipped.
+    """
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+        fmt = request.args.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or BULK_FORMATS.get(request.mimetype)
+    if fmt not in BULK_FORMATS.values():
+        return jsonify({'error': 'Unsupported import format'}), 400
+    
+    try:
+        result = import_transactions(
+            current_user.id, fmt, stream, request.args.get('category_id', type=int)
+        )
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Invalid data format'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to import transactions'}), 500
+    
+    return jsonify(dict(result, message='Import completed')), 201
+
+EXPORT_FIELDS = ['id', 'date', 'amount', 'currency', 'description', 'merchant', 'category_id', 'category_name', 'category_type']
+EXPORT_CHUNK_BYTES = 64 * 1024
+EXPORT_PARQUET_ROW_GROUP = 50000
+
+def export_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        record = serialize_transaction(row)
+        writer.writerow([record[field] for field in EXPORT_FIELDS])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+def export_ndjson(rows):
+    chunk = []
+    size = 0
+    for row in rows:
+        record = serialize_transaction(row)
+        line = json.dumps({field: record[field] for field in EXPORT_FIELDS}) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(chunk).encode()
+            chunk = []
+            size = 0
+    yield ''.join(chunk).encode()
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator"""
+    closed = False
+    
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def export_parquet(rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('date', pa.date32()),
+        ('amount', pa.decimal128(18, 2)),
+        ('currency', pa.string()),
+        ('description', pa.string()),
+        ('merchant', pa.string()),
+        ('category_id', pa.int64()),
+        ('category_name', pa.string()),
+        ('category_type', pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    columns = {field: [] for field in EXPORT_FIELDS}
+    
+    def write_group():
+        writer.write_table(pa.table(columns, schema=schema))
+        for values in columns.values():
+            values.clear()
+    
+    # Each row group is flushed to the client as soon as it is written
+    for row in rows:
+        for field in EXPORT_FIELDS:
+            # Exact decimal built from the integer cents, not a float
+            columns[field].append(cents_to_decimal(row.amount_cents) if field == 'amount' else getattr(row, field))
+        if len(columns['id']) >= EXPORT_PARQUET_ROW_GROUP:
+            write_group()
+            yield sink.drain()
+    if columns['id']:
+        write_group()
+    writer.close()
+    yield sink.drain()
+
+EXPORT_FORMATS = {
+    'csv': (export_csv, 'text/csv'),
+    'ndjson': (export_ndjson, 'application/x-ndjson'),
+    'parquet': (export_parquet, 'application/vnd.apache.parquet'),
+}
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.route('/api/export')
+@login_required
+def api_export():
+    """Stream the user's ledger as CSV, NDJSON or Parquet.
+    
+    Rows are read in batches from a server-side cursor and written out as
+    they arrive, so memory use does not grow with the size of the ledger.
+    Supports the same filters as GET /api/transactions.
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': 'Unsupported export format'}), 400
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            return jsonify({'error': 'Parquet export requires pyarrow'}), 501
+    
+    try:
+        query = filtered_transactions_query(current_user.id, request.args)
+    except ValueError as e:
+        return jsonify({'error': 'Invalid data format'}), 400
+    
+    writer, mimetype = EXPORT_FORMATS[fmt]
+    chunks = writer(query.yield_per(TRANSACTIONS_STREAM_BATCH))
+    headers = {
+        'Content-Disposition': f'attachment; filename=transactions.{fmt}',
+        'Vary': 'Accept-Encoding',
+    }
+    # Parquet is already compressed internally
+    if fmt != 'parquet' and request.accept_encodings['gzip']:
+        chunks = gzip_stream(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
 @app.route('/api/transactions/<int:transaction_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
 def api_transaction(transaction_id):
+    if request.method == 'GET':
+        row = transaction_rows(current_user.id).filter(Transaction.id == transaction_id).first()
+        if not row:
+            return jsonify({'error': 'Transaction not found'}), 404
+        return jsonify(serialize_transaction(row))
+    
     # Get transaction belonging to current user
     transaction = Transaction.query.filter_by(id=transaction_id, user_id=current_user.id).first()
     if not transaction:
         return jsonify({'error': 'Transaction not found'}), 404
     
-    if request.method == 'GET':
-        return jsonify({
-            'id': transaction.id,
-            'amount': transaction.amount,
-            'description': transaction.description,
-            'date': transaction.date.isoformat(),
-            'category_id': transaction.category_id,
-            'category_name': transaction.category.name,
-            'category_type': transaction.category.type
-        })
-    
-    elif request.method == 'PUT':
+    if request.method == 'PUT':
         try:
             data = request.get_json()
+            # Back out the old amount; the row may move across months or categories
+            rollup_remove(transaction)
             
             # Update fields if provided
             if 'category_id' in data:
-                category = Category.query.get(data['category_id'])
+                category = category_cache.get(data['category_id'])
                 if not category:
+                    db.session.rollback()
                     return jsonify({'error': 'Invalid category'}), 400
-                transaction.category_id = data['category_id']
+                transaction.category_id = category.id
             
             if 'amount' in data:
-                transaction.amount = float(data['amount'])
+                transaction.amount_cents = to_cents(data['amount'])
+            
+            if 'currency' in data:
+                transaction.currency = parse_currency(data['currency'])
             
             if 'description' in data:
                 transaction.description = data['description']
@@ -287,20 +3061,18 @@ def api_transaction(transaction_id):
             if 'date' in data:
                 transaction.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
             
+            rollup_add(transaction)
             db.session.commit()
             
             return jsonify({
                 'message': 'Transaction updated successfully',
-                'transaction': {
-                    'id': transaction.id,
-                    'amount': transaction.amount,
-                    'description': transaction.description,
-                    'date': transaction.date.isoformat(),
-                    'category_name': transaction.category.name
-                }
+                'transaction': serialize_transaction(
+                    transaction_rows(current_user.id).filter(Transaction.id == transaction.id).one()
+                )
             })
             
         except ValueError as e:
+            db.session.rollback()
             return jsonify({'error': 'Invalid data format'}), 400
         except Exception as e:
             db.session.rollback()
@@ -308,6 +3080,7 @@ def api_transaction(transaction_id):
     
     elif request.method == 'DELETE':
         try:
+            rollup_remove(transaction)
             db.session.delete(transaction)
             db.session.commit()
             return jsonify({'message': 'Transaction deleted successfully'})
@@ -318,28 +3091,219 @@ def api_transaction(transaction_id):
 @app.route('/api/categories', methods=['GET'])
 @login_required
 def api_categories():
-    categories = Category.query.all()
-    return jsonify([{
-        'id': c.id,
-        'name': c.name,
-        'type': c.type,
-        'color': c.color
-    } for c in categories])
+    # Serve the cached, pre-serialized body; unchanged clients get a 304
+    category_cache.refresh()
+    response = Response(category_cache.body, mimetype='application/json')
+    response.set_etag(category_cache.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/rules', methods=['GET', 'POST'])
+@login_required
+def api_rules():
+    if request.method == 'GET':
+        rules = CategoryRule.query.filter_by(user_id=current_user.id).order_by(
+            CategoryRule.priority, CategoryRule.id
+        ).all()
+        return jsonify([serialize_rule(r) for r in rules])
+    
+    elif request.method == 'POST':
+        try:
+            data = request.get_json()
+            
+            if 'category_id' not in data:
+                return jsonify({'error': 'Missing required fields'}), 400
+            if CategoryRule.query.filter_by(user_id=current_user.id).count() >= RULES_MAX_PER_USER:
+                return jsonify({'error': 'Too many rules'}), 400
+            
+            rule = CategoryRule(user_id=current_user.id, match_type='contains', pattern='', priority=100)
+            update_rule_from_json(rule, data)
+            db.session.add(rule)
+            db.session.commit()
+            
+            return jsonify({
+                'message': 'Rule created successfully',
+                'rule': serialize_rule(rule)
+            }), 201
+            
+        except ValueError as e:
+            return jsonify({'error': str(e) or 'Invalid data format'}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to create rule'}), 500
+
+@app.route('/api/rules/<int:rule_id>', methods=['PUT', 'DELETE'])
+@login_required
+def api_rule(rule_id):
+    rule = CategoryRule.query.filter_by(id=rule_id, user_id=current_user.id).first()
+    if not rule:
+        return jsonify({'error': 'Rule not found'}), 404
+    
+    if request.method == 'PUT':
+        try:
+            update_rule_from_json(rule, request.get_json())
+            db.session.commit()
+            return jsonify({
+                'message': 'Rule updated successfully',
+                'rule': serialize_rule(rule)
+            })
+        except ValueError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e) or 'Invalid data format'}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to update rule'}), 500
+    
+    elif request.method == 'DELETE':
+        try:
+            db.session.delete(rule)
+            db.session.commit()
+            return jsonify({'message': 'Rule deleted successfully'})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to delete rule'}), 500
+
+@app.route('/api/rules/apply', methods=['POST'])
+@login_required
+def api_rules_apply():
+    """Re-run the user's rules over stored transactions.
+    
+    JSON body (all optional): scope ('uncategorized' or 'all'),
+    transaction_ids, start_date and end_date. Large histories can use a
+    background job of kind 'apply_rules' with the same params instead.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        result = apply_rules(
+            current_user.id, data.get('transaction_ids'), data.get('scope', 'uncategorized'),
+            data.get('start_date'), data.get('end_date')
+        )
+        return jsonify(dict(result, message='Rules applied'))
+    except (TypeError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': 'Invalid data format'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to apply rules'}), 500
+
+@app.route('/api/recurring', methods=['GET', 'POST'])
+@login_required
+def api_recurring():
+    if request.method == 'GET':
+        schedules = RecurringTransaction.query.filter_by(user_id=current_user.id).order_by(
+            RecurringTransaction.id
+        ).all()
+        return jsonify([serialize_recurring(r) for r in schedules])
+    
+    elif request.method == 'POST':
+        try:
+            data = request.get_json()
+            
+            # Validate required fields
+            if not all(key in data for key in ['category_id', 'amount', 'start_date']):
+                return jsonify({'error': 'Missing required fields'}), 400
+            if not data.get('rrule') and 'frequency' not in data:
+                return jsonify({'error': 'Missing required fields'}), 400
+            
+            schedule = RecurringTransaction(user_id=current_user.id)
+            update_recurring_from_json(schedule, data, creating=True)
+            db.session.add(schedule)
+            db.session.flush()
+            # Past-dated schedules are caught up immediately
+            materialize_recurring(schedule, date.today())
+            db.session.commit()
+            
+            return jsonify({
+                'message': 'Recurring transaction created successfully',
+                'recurring': serialize_recurring(schedule)
+            }), 201
+            
+        except (KeyError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': 'Invalid data format'}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to create recurring transaction'}), 500
+
+@app.route('/api/recurring/<int:recurring_id>', methods=['PUT', 'DELETE'])
+@login_required
+def api_recurring_item(recurring_id):
+    schedule = RecurringTransaction.query.filter_by(id=recurring_id, user_id=current_user.id).first()
+    if not schedule:
+        return jsonify({'error': 'Recurring transaction not found'}), 404
+    
+    if request.method == 'PUT':
+        try:
+            update_recurring_from_json(schedule, request.get_json())
+            db.session.flush()
+            materialize_recurring(schedule, date.today())
+            db.session.commit()
+            return jsonify({
+                'message': 'Recurring transaction updated successfully',
+                'recurring': serialize_recurring(schedule)
+            })
+        except (KeyError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': 'Invalid data format'}), 400
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to update recurring transaction'}), 500
+    
+    elif request.method == 'DELETE':
+        # Transactions already written stay; only future occurrences stop
+        try:
+            db.session.delete(schedule)
+            db.session.commit()
+            return jsonify({'message': 'Recurring transaction deleted successfully'})
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to delete recurring transaction'}), 500
+
+@app.route('/api/recurring/upcoming')
+@login_required
+def api_recurring_upcoming():
+    """Occurrences due after today up to ?until=YYYY-MM-DD (default 30 days), without writing them"""
+    try:
+        today = date.today()
+        until = (datetime.strptime(request.args['until'], '%Y-%m-%d').date()
+                 if request.args.get('until') else today + timedelta(days=30))
+        until = min(until, today + timedelta(days=RECURRING_UPCOMING_MAX_DAYS))
+    except ValueError as e:
+        return jsonify({'error': 'Invalid data format'}), 400
+    
+    schedules = RecurringTransaction.query.filter(
+        RecurringTransaction.user_id == current_user.id,
+        RecurringTransaction.next_date <= until
+    ).all()
+    upcoming = []
+    for schedule in schedules:
+        category = category_cache.get(schedule.category_id)
+        for _, day in occurrences(schedule, today + timedelta(days=1), until):
+            upcoming.append({
+                'recurring_id': schedule.id,
+                'date': day.isoformat(),
+                'amount': cents_to_json(schedule.amount_cents),
+                'amount_cents': schedule.amount_cents,
+                'currency': schedule.currency,
+                'description': schedule.description,
+                'category_id': schedule.category_id,
+                'category_name': category.name if category else None,
+                'category_type': category.type if category else None
+            })
+            if len(upcoming) >= RECURRING_UPCOMING_MAX_ROWS:
+                break
+    upcoming.sort(key=lambda o: (o['date'], o['recurring_id']))
+    return jsonify(upcoming[:RECURRING_UPCOMING_MAX_ROWS])
 
 @app.route('/api/budgets', methods=['GET', 'POST'])
 @login_required
 def api_budgets():
     if request.method == 'GET':
-        budgets = Budget.query.filter_by(user_id=current_user.id).all()
-        return jsonify([{
-            'id': b.id,
-            'category_id': b.category_id,
-            'category_name': b.category.name,
-            'amount': b.amount,
-            'month': b.month,
-            'year': b.year,
-            'created_at': b.created_at.isoformat()
-        } for b in budgets])
+        seq = current_change_seq(current_user.id)
+        budgets = budget_rows(current_user.id).all()
+        response = jsonify([serialize_budget(b) for b in budgets])
+        response.headers['X-Change-Seq'] = str(seq)
+        return response
     
     elif request.method == 'POST':
         try:
@@ -350,14 +3314,14 @@ def api_budgets():
                 return jsonify({'error': 'Missing required fields'}), 400
             
             # Verify category exists
-            category = Category.query.get(data['category_id'])
+            category = category_cache.get(data['category_id'])
             if not category:
                 return jsonify({'error': 'Invalid category'}), 400
             
             # Check if budget already exists for this category/month/year
             existing_budget = Budget.query.filter_by(
                 user_id=current_user.id,
-                category_id=data['category_id'],
+                category_id=category.id,
                 month=data['month'],
                 year=data['year']
             ).first()
@@ -368,8 +3332,9 @@ def api_budgets():
             # Create new budget
             budget = Budget(
                 user_id=current_user.id,
-                category_id=data['category_id'],
-                amount=float(data['amount']),
+                category_id=category.id,
+                amount_cents=to_cents(data['amount']),
+                currency=parse_currency(data.get('currency')),
                 month=int(data['month']),
                 year=int(data['year'])
             )
@@ -379,13 +3344,9 @@ def api_budgets():
             
             return jsonify({
                 'message': 'Budget created successfully',
-                'budget': {
-                    'id': budget.id,
-                    'category_name': budget.category.name,
-                    'amount': budget.amount,
-                    'month': budget.month,
-                    'year': budget.year
-                }
+                'budget': serialize_budget(
+                    budget_rows(current_user.id).filter(Budget.id == budget.id).one()
+                )
             }), 201
             
         except ValueError as e:
@@ -394,6 +3355,65 @@ def api_budgets():
             db.session.rollback()
             return jsonify({'error': 'Failed to create budget'}), 500
 
+def budget_progress_rows(user_id):
+    """Query of budgets with their month's spend.
+    
+    Spend comes from the monthly rollup, so every budget is matched to its
+    category's total in a single outer-joined query.
+    """
+    return db.session.query(
+        Budget.id,
+        Budget.category_id,
+        Category.name.label('category_name'),
+        Category.color.label('category_color'),
+        Budget.month,
+        Budget.year,
+        Budget.amount_cents.label('budgeted'),
+        db.func.coalesce(MonthlyRollup.total_cents, 0).label('spent')
+    ).join(Category, Budget.category_id == Category.id).outerjoin(MonthlyRollup, db.and_(
+        MonthlyRollup.user_id == Budget.user_id,
+        MonthlyRollup.category_id == Budget.category_id,
+        MonthlyRollup.year == Budget.year,
+        MonthlyRollup.month == Budget.month
+    )).filter(Budget.user_id == user_id)
+
+def serialize_budget_progress(row):
+    return {
+        'id': row.id,
+        'category_id': row.category_id,
+        'category_name': row.category_name,
+        'category_color': row.category_color,
+        'month': row.month,
+        'year': row.year,
+        'budgeted': cents_to_json(row.budgeted),
+        'spent': cents_to_json(row.spent),
+        'remaining': cents_to_json(row.budgeted - row.spent),
+        'percent_used': round(row.spent * 100 / row.budgeted, 1) if row.budgeted else None
+    }
+
+@app.route('/api/budgets/progress')
+@login_required
+def api_budget_progress():
+    """Budgeted vs. spent for each budget, optionally limited to one year/month"""
+    try:
+        seq = current_change_seq(current_user.id)
+        query = budget_progress_rows(current_user.id)
+        if 'year' in request.args:
+            query = query.filter(Budget.year == int(request.args['year']))
+        if 'month' in request.args:
+            query = query.filter(Budget.month == int(request.args['month']))
+        
+        results = query.order_by(Budget.year.desc(), Budget.month.desc(), Category.name).all()
+        
+        response = jsonify([serialize_budget_progress(r) for r in results])
+        response.headers['X-Change-Seq'] = str(seq)
+        return response
+        
+    except ValueError as e:
+        return jsonify({'error': 'Invalid data format'}), 400
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch budget progress'}), 500
+
 @app.route('/api/budgets/<int:budget_id>', methods=['PUT', 'DELETE'])
 @login_required
 def api_budget(budget_id):
@@ -406,7 +3426,10 @@ def api_budget(budget_id):
             data = request.get_json()
             
             if 'amount' in data:
-                budget.amount = float(data['amount'])
+                budget.amount_cents = to_cents(data['amount'])
+            
+            if 'currency' in data:
+                budget.currency = parse_currency(data['currency'])
             
             if 'month' in data:
                 budget.month = int(data['month'])
@@ -414,21 +3437,35 @@ def api_budget(budget_id):
             if 'year' in data:
                 budget.year = int(data['year'])
             
+            # The same uniqueness rule as POST, checked before the index rejects it
+            with db.session.no_autoflush:
+                clash = Budget.query.filter(
+                    Budget.user_id == current_user.id,
+                    Budget.category_id == budget.category_id,
+                    Budget.month == budget.month,
+                    Budget.year == budget.year,
+                    Budget.id != budget.id
+                ).first()
+            if clash:
+                db.session.rollback()
+                return jsonify({'error': 'Budget already exists for this category and month'}), 400
+            
             db.session.commit()
             
             return jsonify({
                 'message': 'Budget updated successfully',
-                'budget': {
-                    'id': budget.id,
-                    'category_name': budget.category.name,
-                    'amount': budget.amount,
-                    'month': budget.month,
-                    'year': budget.year
-                }
+                'budget': serialize_budget(
+                    budget_rows(current_user.id).filter(Budget.id == budget.id).one()
+                )
             })
             
         except ValueError as e:
+            db.session.rollback()
             return jsonify({'error': 'Invalid data format'}), 400
+        except IntegrityError as e:
+            # A concurrent write took the slot between the check and the commit
+            db.session.rollback()
+            return jsonify({'error': 'Budget already exists for this category and month'}), 400
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': 'Failed to update budget'}), 500
@@ -442,6 +3479,89 @@ def api_budget(budget_id):
             db.session.rollback()
             return jsonify({'error': 'Failed to delete budget'}), 500
 
+def change_feed(user_id, since):
+    """Changes after since, collapsed to the latest state of each touched row.
+    
+    Upserts carry the row as the listing endpoints serialize it (budgets with
+    their progress); tombstones are bare ids. An entity listed under 'reset'
+    had a bulk write, or history the client missed, and must be refetched.
+    """
+    feed = {'seq': since, 'has_more': False, 'reset': []}
+    for entity in CHANGE_ENTITIES:
+        feed[entity + 's'] = {'upserted': [], 'deleted': []}
+    
+    changes = db.session.query(ChangeLog.seq, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op).filter(
+        ChangeLog.user_id == user_id, ChangeLog.seq > since
+    ).order_by(ChangeLog.seq).limit(CHANGES_PAGE_SIZE + 1).all()
+    if not changes:
+        latest = current_change_seq(user_id)
+        if since != latest:
+            # Ahead of the server (e.g. after a database restore), or behind
+            # it with the entries in between already pruned
+            feed.update(seq=latest, reset=sorted(CHANGE_ENTITIES))
+        return feed
+    
+    feed['has_more'] = len(changes) > CHANGES_PAGE_SIZE
+    changes = changes[:CHANGES_PAGE_SIZE]
+    feed['seq'] = changes[-1].seq
+    # Sequences are gapless, so a gap means older entries were pruned
+    reset = set(CHANGE_ENTITIES) if changes[0].seq != since + 1 else set()
+    latest_op = {}
+    for change in changes:
+        if change.op == 'reset':
+            reset.add(change.entity)
+        else:
+            latest_op[(change.entity, change.entity_id)] = change.op
+    feed['reset'] = sorted(reset)
+    
+    sources = {
+        'transaction': (transaction_rows, Transaction.id, serialize_transaction),
+        'budget': (budget_progress_rows, Budget.id, serialize_budget_progress),
+    }
+    for entity, (rows, id_column, serialize) in sources.items():
+        if entity in reset:
+            continue
+        upserted = [i for (e, i), op in latest_op.items() if e == entity and op == 'upsert']
+        deleted = [i for (e, i), op in latest_op.items() if e == entity and op == 'delete']
+        found = {row.id: row for row in rows(user_id).filter(id_column.in_(upserted))} if upserted else {}
+        feed[entity + 's'] = {
+            'upserted': [serialize(found[i]) for i in upserted if i in found],
+            # Rows deleted after their change was read are tombstones already
+            'deleted': deleted + [i for i in upserted if i not in found]
+        }
+    return feed
+
+@app.route('/api/changes')
+@login_required
+def api_changes():
+    """Changes to the user's transactions and budgets after ?since=<seq>.
+    
+    With ?wait=<seconds> the request long-polls until something changes or
+    the wait (capped by CHANGES_MAX_WAIT_SECONDS) runs out.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        wait = min(float(request.args.get('wait', 0)), app.config['CHANGES_MAX_WAIT_SECONDS'])
+        if since < 0 or wait < 0:
+            raise ValueError('since and wait must not be negative')
+    except ValueError as e:
+        return jsonify({'error': 'Invalid data format'}), 400
+    
+    try:
+        user_id = current_user.id
+        feed = change_feed(user_id, since)
+        deadline = time.monotonic() + wait
+        while feed['seq'] == since and time.monotonic() < deadline:
+            # Give the connection back to the pool while idle; commits in this
+            # process wake the wait early, other workers' within a poll interval
+            db.session.close()
+            with change_notifier:
+                change_notifier.wait(min(deadline - time.monotonic(), app.config['CHANGES_POLL_SECONDS']))
+            feed = change_feed(user_id, since)
+        return jsonify(feed)
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch changes'}), 500
+
 @app.route('/api/stats/spending-by-category')
 @login_required
 def api_spending_by_category():
@@ -450,24 +3570,13 @@ def api_spending_by_category():
         month = request.args.get('month', datetime.now().month, type=int)
         year = request.args.get('year', datetime.now().year, type=int)
         
-        # Query spending by category for the specified month
-        results = db.session.query(
-            Category.name,
-            Category.color,
-            db.func.sum(Transaction.amount).label('total')
-        ).join(Transaction).filter(
-            Transaction.user_id == current_user.id,
-            Category.type == 'expense',
-            db.extract('month', Transaction.date) == month,
-            db.extract('year', Transaction.date) == year
-        ).group_by(Category.id).all()
-        
-        return jsonify([{
-            'category': r.name,
-            'amount': float(r.total),
-            'color': r.color
-        } for r in results])
+        return cached_stats_response(
+            'spending-by-category', current_user.id, year, month,
+            lambda: spending_by_category(current_user.id, year, month)
+        )
         
+    except ValueError as e:
+        return jsonify({'error': 'Invalid data format'}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch spending data'}), 500
 
@@ -475,39 +3584,162 @@ def api_spending_by_category():
 @login_required
 def api_monthly_summary():
     try:
+        # Multi-month series, e.g. ?from=2025-01&to=2026-10, in one query
+        if 'from' in request.args or 'to' in request.args:
+            start_year, start_month = parse_year_month(request.args['from'])
+            end_year, end_month = parse_year_month(request.args['to'])
+            if (start_year, start_month) > (end_year, end_month):
+                return jsonify({'error': 'Invalid date range'}), 400
+            return jsonify({'months': monthly_summaries(
+                current_user.id, start_year, start_month, end_year, end_month
+            )})
+        
         month = request.args.get('month', datetime.now().month, type=int)
         year = request.args.get('year', datetime.now().year, type=int)
         
-        # Calculate income and expenses
-        income = db.session.query(db.func.sum(Transaction.amount)).join(Category).filter(
-            Transaction.user_id == current_user.id,
-            Category.type == 'income',
-            db.extract('month', Transaction.date) == month,
-            db.extract('year', Transaction.date) == year
-        ).scalar() or 0
-        
-        expenses = db.session.query(db.func.sum(Transaction.amount)).join(Category).filter(
-            Transaction.user_id == current_user.id,
-            Category.type == 'expense',
-            db.extract('month', Transaction.date) == month,
-            db.extract('year', Transaction.date) == year
-        ).scalar() or 0
+        return cached_stats_response(
+            'monthly-summary', current_user.id, year, month,
+            lambda: monthly_summary(current_user.id, year, month)
+        )
+        
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': 'Invalid data format'}), 400
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch monthly summary'}), 500
+
+@app.route('/api/jobs', methods=['GET', 'POST'])
+@login_required
+def api_jobs():
+    if request.method == 'GET':
+        jobs = Job.query.filter_by(user_id=current_user.id).order_by(Job.id.desc()).limit(50).all()
+        return jsonify([serialize_job(j) for j in jobs])
+    
+    elif request.method == 'POST':
+        # JSON body {"kind": ..., "params": {...}}, or multipart with a "file"
+        # field and the kind/params as form fields for imports
+        upload = request.files.get('file')
+        try:
+            if upload:
+                kind = request.form.get('kind', 'import')
+                params = json.loads(request.form.get('params') or '{}')
+                params.setdefault('format', upload.filename.rsplit('.', 1)[-1].lower())
+            else:
+                data = request.get_json()
+                kind = data.get('kind')
+                params = data.get('params') or {}
+            if not isinstance(params, dict):
+                raise ValueError('params must be an object')
+        except (AttributeError, ValueError) as e:
+            return jsonify({'error': 'Invalid data format'}), 400
+        
+        if kind not in JOB_HANDLERS:
+            return jsonify({'error': 'Unknown job kind'}), 400
+        if kind == 'import' and (not upload or params.get('format') not in BULK_FORMATS.values()):
+            return jsonify({'error': 'Import jobs need a file in a supported format'}), 400
+        
+        pending = Job.query.filter(
+            Job.user_id == current_user.id, Job.status.in_(('queued', 'running'))
+        ).count()
+        if pending >= app.config['JOB_USER_QUEUE_LIMIT']:
+            return jsonify({'error': 'Too many pending jobs'}), 429
+        
+        try:
+            job = Job(
+                user_id=current_user.id,
+                kind=kind,
+                params=json.dumps(params),
+                input=upload.read() if upload else None
+            )
+            db.session.add(job)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': 'Failed to create job'}), 500
+        
+        job_runner.notify()
+        response = jsonify({'message': 'Job queued', 'job': serialize_job(job)})
+        response.headers['Location'] = url_for('api_job', job_id=job.id)
+        return response, 202
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+@login_required
+def api_job(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(serialize_job(job))
+
+@app.route('/api/jobs/<int:job_id>/result', methods=['GET'])
+@login_required
+def api_job_result(job_id):
+    job = Job.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status != 'succeeded':
+        return jsonify({'error': 'Job has no result yet', 'status': job.status}), 409
+    
+    headers = {}
+    if job.kind == 'export':
+        fmt = json.loads(job.params or '{}').get('format', 'csv')
+        headers['Content-Disposition'] = f'attachment; filename=transactions-{job.id}.{fmt}'
+    if job.result is None:
+        return Response(stream_with_context(iter_job_result(job.id)), mimetype=job.result_mimetype, headers=headers)
+    return Response(job.result, mimetype=job.result_mimetype, headers=headers)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint; requires Authorization: Bearer <METRICS_TOKEN>"""
+    token = app.config['METRICS_TOKEN']
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return Response('Unauthorized\n', status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/stats/trends')
+@login_required
+def api_trends():
+    """Rolling averages, month-over-month deltas, anomaly flags and a month-end forecast"""
+    try:
+        months = min(max(request.args.get('months', 12, type=int), 1), 120)
+        trends = user_trends(current_user.id, date.today())
+        
+        last = trends['totals'].shape[1]
+        window = slice(max(last - months, 0), last)
+        first_month = trends['first_month'] + window.start
+        labels = [f'{(m // 12):04d}-{(m % 12) + 1:02d}' for m in range(first_month, trends['first_month'] + last)]
         
+        categories = []
+        for i, category_id in enumerate(trends['category_ids'].tolist()):
+            category = category_cache.get(category_id)
+            categories.append({
+                'category_id': category_id,
+                'category_name': category.name if category else None,
+                'category_type': category.type if category else None,
+                'category_color': category.color if category else None,
+                'totals': to_json_list(trends['totals'][i, window]),
+                **{f'rolling_{w}': to_json_list(trends['rolling'][w][i, window]) for w in TREND_WINDOWS},
+                'mom_delta': to_json_list(trends['mom_delta'][i, window]),
+                'mom_pct': to_json_list(trends['mom_pct'][i, window]),
+                'anomalies': [labels[j] for j in np.flatnonzero(trends['anomalies'][i, window])],
+                'forecast': {
+                    'month_to_date': round(float(trends['month_to_date'][i]), 2),
+                    'projected': round(float(trends['projected'][i]), 2)
+                }
+            })
+        
+        expense = np.array([c['category_type'] == 'expense' for c in categories], dtype=bool)
         return jsonify({
-            'month': month,
-            'year': year,
-            'income': float(income),
-            'expenses': float(expenses),
-            'balance': float(income - expenses),
-            'transaction_count': Transaction.query.filter(
-                Transaction.user_id == current_user.id,
-                db.extract('month', Transaction.date) == month,
-                db.extract('year', Transaction.date) == year
-            ).count()
+            'months': labels,
+            'categories': categories,
+            'forecast': {
+                'month_to_date': round(float(trends['month_to_date'][expense].sum()), 2) if len(expense) else 0.0,
+                'projected': round(float(trends['projected'][expense].sum()), 2) if len(expense) else 0.0
+            }
         })
         
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch monthly summary'}), 500
+        return jsonify({'error': 'Failed to compute trends'}), 500
 
 @app.route('/test-db')
 def test_db():
@@ -529,39 +3761,112 @@ def test_db():
     except Exception as e:
         return f"❌ Database error: {str(e)}"
 
+def migrate_money_columns():
+    """Convert float `amount` columns from older databases to integer cents.
+    
+    Adds amount_cents/currency, backfills them by rounding amount * 100 and
+    drops the float column. Rollups keyed on the old float total are dropped
+    and recreated; init_db() rebuilds them from the converted transactions.
+    """
+    engine = primary_engine()
+    inspector = db.inspect(engine)
+    quote = engine.dialect.identifier_preparer.quote
+    default_currency = parse_currency(None)
+    with engine.begin() as connection:
+        for table in (Transaction.__table__, Budget.__table__):
+            columns = {c['name'] for c in inspector.get_columns(table.name)}
+            if 'amount_cents' in columns or 'amount' not in columns:
+                continue
+            name = quote(table.name)
+            print(f"Migrating {table.name}.amount to integer cents...")
+            connection.execute(db.text(f"ALTER TABLE {name} ADD COLUMN amount_cents BIGINT NOT NULL DEFAULT 0"))
+            connection.execute(db.text(
+                f"ALTER TABLE {name} ADD COLUMN currency VARCHAR(3) NOT NULL DEFAULT '{default_currency}'"
+            ))
+            connection.execute(db.text(f"UPDATE {name} SET amount_cents = CAST(ROUND(amount * 100) AS BIGINT)"))
+            connection.execute(db.text(f"ALTER TABLE {name} DROP COLUMN amount"))
+        
+        rollup_columns = {c['name'] for c in inspector.get_columns(MonthlyRollup.__tablename__)}
+        if rollup_columns and 'total_cents' not in rollup_columns:
+            MonthlyRollup.__table__.drop(bind=connection)
+            MonthlyRollup.__table__.create(bind=connection)
+
+def upgrade_db():
+    """Add indexes declared on the models, and the search index, to existing tables.
+
+    db.create_all() only creates missing tables, so existing SQLite/Postgres
+    databases need their indexes created explicitly. Safe to run repeatedly.
+    """
+    migrate_money_columns()
+    engine = primary_engine()
+    columns = {c['name'] for c in db.inspect(engine).get_columns(Transaction.__tablename__)}
+    if 'merchant' not in columns:
+        with engine.begin() as connection:
+            connection.execute(db.text('ALTER TABLE "transaction" ADD COLUMN merchant VARCHAR(100)'))
+    for table in (Transaction.__table__, Budget.__table__, CategoryRule.__table__, RecurringTransaction.__table__,
+                  ChangeLog.__table__):
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                # Most likely duplicate budgets blocking the unique index
+                print(f"❌ Error creating index {index.name}: {e}")
+    ensure_search_index()
+
 def init_db():
-    """Initialize database and create default categories"""
-    with app.app_context():
-        # Create all tables
-        db.create_all()
-        
-        # Create default categories if they don't exist
-        if not Category.query.first():
-            default_categories = [
-                ('Salary', 'income', '#28a745'),
-                ('Freelance', 'income', '#20c997'),
-                ('Investment', 'income', '#17a2b8'),
-                ('Food & Dining', 'expense', '#dc3545'),
-                ('Transportation', 'expense', '#fd7e14'),
-                ('Entertainment', 'expense', '#6f42c1'),
-                ('Utilities', 'expense', '#ffc107'),
-                ('Healthcare', 'expense', '#e83e8c'),
-                ('Shopping', 'expense', '#6c757d'),
-                ('Education', 'expense', '#007bff'),
-            ]
-            
-            for name, category_type, color in default_categories:
-                category = Category(name=name, type=category_type, color=color)
-                db.session.add(category)
+    """Initialize the default database and each shard, with default categories"""
+    for shard in database_router.contexts():
+        with app.app_context(), using_shard(shard):
+            # Create all tables
+            db.metadata.create_all(bind=primary_engine())
+            upgrade_db()
             
-            try:
+            # Backfill rollups for databases created before the rollup table existed
+            if not MonthlyRollup.query.first() and Transaction.query.first():
+                rebuild_rollups()
+            
+            # Create default categories if they don't exist
+            if not Category.query.first():
+                default_categories = [
+                    ('Salary', 'income', '#28a745'),
+                    ('Freelance', 'income', '#20c997'),
+                    ('Investment', 'income', '#17a2b8'),
+                    ('Food & Dining', 'expense', '#dc3545'),
+                    ('Transportation', 'expense', '#fd7e14'),
+                    ('Entertainment', 'expense', '#6f42c1'),
+                    ('Utilities', 'expense', '#ffc107'),
+                    ('Healthcare', 'expense', '#e83e8c'),
+                    ('Shopping', 'expense', '#6c757d'),
+                    ('Education', 'expense', '#007bff'),
+                ]
+            
+                for name, category_type, color in default_categories:
+                    category = Category(name=name, type=category_type, color=color)
+                    db.session.add(category)
+            
+                try:
+                    db.session.commit()
+                    print("✅ Default categories created successfully!")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Error creating categories: {e}")
+            
+            # Fallback for transactions no rule matched; checked separately so
+            # databases seeded before rules existed get it too
+            if not Category.query.filter_by(name=UNCATEGORIZED).first():
+                db.session.add(Category(name=UNCATEGORIZED, type='expense', color='#adb5bd'))
                 db.session.commit()
-                print("✅ Default categories created successfully!")
-            except Exception as e:
-                db.session.rollback()
-                print(f"❌ Error creating categories: {e}")
+            
+            # Warm the category cache for this process
+            category_cache.refresh(force=True)
 
-if __name__ == '__main__':
+@app.cli.command('init-db')
+def init_db_command():
+    """Create tables, indexes and default categories. Run once per deploy."""
     init_db()
+    print("✅ Database initialized successfully!")
+
+if __name__ == '__main__':
+    # Development server only; production runs wsgi:app under gunicorn
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""Measure per-request authentication overhead and login throughput.
+
+Through the Flask test client:
+
+  overhead: GET /api/categories (a cached, near-free view) as a logged-in
+            user, with the load_user cache disabled and enabled; reports
+            p50 latency and SQL statements per request
+  logins:   THREADS clients POST /login in a loop for --seconds while one more
+            client keeps making authenticated GETs; reports logins per second
+            and the GET latency seen during the login storm
+
+Usage:
+    python benchmarks/auth_overhead.py [--threads 8] [--seconds 5] [--method pbkdf2:sha256:600000]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synthetic import PASSWORD
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--repeat', type=int, default=2000)
+    parser.add_argument('--method', default=None, help='PASSWORD_HASH_METHOD to benchmark')
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a scratch SQLite file')
+    return parser.parse_args()
+
+
+def percentile(timings, pct):
+    return statistics.quantiles(timings, n=100)[pct - 1] * 1000
+
+
+def measure_overhead(money_tracker, client, repeat):
+    timings, queries = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get('/api/categories')
+        timings.append(time.perf_counter() - started)
+        queries.append(int(re.search(r'"(\d+) queries"', response.headers['Server-Timing']).group(1)))
+    return statistics.median(timings) * 1000, statistics.mean(queries)
+
+
+def login_loop(money_tracker, deadline, logins):
+    client = money_tracker.app.test_client()
+    while time.perf_counter() < deadline:
+        response = client.post('/login', data={'username': 'auth', 'password': PASSWORD})
+        logins.append(response.status_code)
+
+
+def reader_loop(client, deadline, timings):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        client.get('/api/categories')
+        timings.append(time.perf_counter() - started)
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + tempfile.mktemp(suffix='.db')
+    if args.method:
+        os.environ['PASSWORD_HASH_METHOD'] = args.method
+
+    import app as money_tracker
+
+    money_tracker.init_db()
+    client = money_tracker.app.test_client()
+    client.post('/register', data={'username': 'auth', 'email': 'auth@example.com', 'password': PASSWORD})
+    client.post('/login', data={'username': 'auth', 'password': PASSWORD})
+
+    ttl = money_tracker.app.config['USER_CACHE_SECONDS']
+    for label, seconds in [('uncached', 0), ('cached', ttl)]:
+        money_tracker.app.config['USER_CACHE_SECONDS'] = seconds
+        p50, queries = measure_overhead(money_tracker, client, args.repeat)
+        print(f'{label:>9} load_user: p50 {p50:6.3f} ms  {queries:.1f} queries/request')
+
+    logins, reads = [], []
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=login_loop, args=(money_tracker, deadline, logins))
+               for _ in range(args.threads)]
+    threads.append(threading.Thread(target=reader_loop, args=(client, deadline, reads)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    succeeded = logins.count(302)
+    print(f'{args.threads} login threads ({money_tracker.app.config["PASSWORD_HASH_METHOD"]}, '
+          f'{money_tracker.app.config["PASSWORD_HASH_WORKERS"]} hash workers): '
+          f'{succeeded / args.seconds:6.1f} logins/s, {logins.count(503)} shed with 503')
+    print(f'authenticated GETs during logins: p50 {percentile(reads, 50):6.2f} ms  p99 {percentile(reads, 99):6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
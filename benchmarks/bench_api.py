@@ -0,0 +1,105 @@
+"""pytest-benchmark microbenchmarks for the /api/* views.
+
+Runs each view through the Flask test client against a synthetic ledger and
+records the SQL statement count per call alongside the timings.
+
+Usage:
+    pytest benchmarks/bench_api.py --benchmark-json=results/api-$(git rev-parse --short HEAD).json
+
+Set BENCH_DATABASE_URL to run against Postgres instead of a scratch SQLite
+file, and BENCH_USERS / BENCH_PER_USER to change the data volume.
+"""
+import os
+import sys
+import tempfile
+from datetime import date
+
+import pytest
+from sqlalchemy.engine import make_url
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ['DATABASE_URL'] = os.environ.get(
+    'BENCH_DATABASE_URL', 'sqlite:///' + tempfile.mktemp(suffix='.db')
+)
+
+import app as money_tracker  # noqa: E402
+from synthetic import generate  # noqa: E402
+
+DIALECT = make_url(os.environ['DATABASE_URL']).get_backend_name()
+
+TODAY = date.today()
+LAST_MONTH = date(TODAY.year - 1, 12, 1) if TODAY.month == 1 else date(TODAY.year, TODAY.month - 1, 1)
+
+READ_ENDPOINTS = [
+    '/api/transactions',
+    '/api/transactions?type=expense&min_amount=50',
+    f'/api/transactions?start_date={LAST_MONTH.isoformat()}&limit=200',
+    '/api/transactions/search?q=coffee',
+    '/api/transactions/search?q=tra',
+    '/api/categories',
+    '/api/rules',
+    '/api/recurring/upcoming',
+    '/api/budgets',
+    f'/api/budgets/progress?year={LAST_MONTH.year}&month={LAST_MONTH.month}',
+    f'/api/stats/spending-by-category?year={LAST_MONTH.year}&month={LAST_MONTH.month}',
+    f'/api/stats/monthly-summary?year={LAST_MONTH.year}&month={LAST_MONTH.month}',
+    f'/api/stats/monthly-summary?from={TODAY.year - 2}-01&to={TODAY.year}-{TODAY.month:02d}',
+    '/api/stats/trends',
+    '/dashboard',
+]
+
+
+@pytest.fixture(scope='module')
+def client():
+    money_tracker.init_db()
+    generate(
+        money_tracker,
+        users=int(os.environ.get('BENCH_USERS', 5)),
+        per_user=int(os.environ.get('BENCH_PER_USER', 5000)),
+    )
+    client = money_tracker.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+    return client
+
+
+@pytest.fixture
+def query_counter():
+    counts = []
+
+    def count(*args, **kwargs):
+        counts[-1] += 1
+
+    with money_tracker.app.app_context():
+        engine = money_tracker.db.engine
+    money_tracker.db.event.listen(engine, 'before_cursor_execute', count)
+    yield counts
+    money_tracker.db.event.remove(engine, 'before_cursor_execute', count)
+
+
+def run(client, counts, method, url, **kwargs):
+    counts.append(0)
+    response = client.open(url, method=method, **kwargs)
+    assert response.status_code < 400, (url, response.status_code)
+    return response
+
+
+@pytest.mark.parametrize('url', READ_ENDPOINTS)
+def test_read(benchmark, client, query_counter, url):
+    benchmark.group = 'read'
+    benchmark(run, client, query_counter, 'GET', url)
+    benchmark.extra_info.update(queries=max(query_counter), dialect=DIALECT)
+
+
+def test_create_transaction(benchmark, client, query_counter):
+    benchmark.group = 'write'
+    payload = {'category_id': 4, 'amount': 12.5, 'description': 'bench', 'date': TODAY.isoformat()}
+    benchmark(run, client, query_counter, 'POST', '/api/transactions', json=payload)
+    benchmark.extra_info.update(queries=max(query_counter), dialect=DIALECT)
+
+
+def test_update_transaction(benchmark, client, query_counter):
+    benchmark.group = 'write'
+    benchmark(run, client, query_counter, 'PUT', '/api/transactions/1', json={'amount': 42})
+    benchmark.extra_info.update(queries=max(query_counter), dialect=DIALECT)
@@ -0,0 +1,96 @@
+"""Compare refetch-after-write against applying /api/changes deltas.
+
+Generates a synthetic user, then performs WRITES single-transaction writes
+(adds, edits and deletes). After each one it measures what the
+transactions and budgets pages download to catch up: the old way (the
+first transactions page plus the budget progress list) and the new way
+(one /api/changes?since= call). Reports bytes and server time per write.
+
+Usage:
+    python benchmarks/change_feed.py [--per-user 5000] [--writes 200] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synthetic import generate
+
+REFETCH_URLS = ['/api/transactions', '/api/budgets/progress']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-user', type=int, default=5000)
+    parser.add_argument('--writes', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a scratch SQLite file')
+    return parser.parse_args()
+
+
+def fetch(client, urls):
+    """Total bytes and seconds to GET each url in turn; returns the last response too"""
+    size = 0
+    started = time.perf_counter()
+    for url in urls:
+        response = client.get(url)
+        size += len(response.data)
+    return size, time.perf_counter() - started, response
+
+
+def write(client, rng, ids):
+    kind = rng.choice(['add', 'add', 'edit', 'delete'])
+    if kind == 'add' or not ids:
+        day = date.today() - timedelta(days=rng.randrange(60))
+        response = client.post('/api/transactions', json={
+            'category_id': 4, 'amount': rng.randint(100, 5000) / 100,
+            'date': day.isoformat(), 'description': 'Benchmark write'})
+        ids.append(response.get_json()['transaction']['id'])
+    elif kind == 'edit':
+        client.put(f'/api/transactions/{rng.choice(ids)}', json={'amount': rng.randint(100, 5000) / 100})
+    else:
+        client.delete(f'/api/transactions/{ids.pop(rng.randrange(len(ids)))}')
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + tempfile.mktemp(suffix='.db')
+
+    import app as money_tracker
+
+    with money_tracker.app.app_context():
+        money_tracker.init_db()
+    generate(money_tracker, users=1, per_user=args.per_user)
+
+    client = money_tracker.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+
+    rng = random.Random(args.seed)
+    ids = []
+    seq = int(client.get('/api/transactions').headers['X-Change-Seq'])
+    results = {'refetch': ([], []), 'changes': ([], [])}
+    for _ in range(args.writes):
+        write(client, rng, ids)
+        size, elapsed, _ = fetch(client, REFETCH_URLS)
+        results['refetch'][0].append(size)
+        results['refetch'][1].append(elapsed)
+        size, elapsed, response = fetch(client, [f'/api/changes?since={seq}'])
+        seq = response.get_json()['seq']
+        results['changes'][0].append(size)
+        results['changes'][1].append(elapsed)
+
+    for name, (sizes, timings) in results.items():
+        print(f'{name:>8}: {statistics.mean(sizes):8,.0f} bytes/write  '
+              f'p50 {statistics.median(timings) * 1000:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
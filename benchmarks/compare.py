@@ -0,0 +1,43 @@
+"""Compare two load_test.py result files and flag latency or query-count regressions.
+
+Usage:
+    python benchmarks/compare.py results/load-abc123.json results/load-def456.json [--threshold 10]
+"""
+import argparse
+import json
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='percent p95 increase reported as a regression')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f'{baseline.get("revision")} -> {candidate.get("revision")}')
+    print(f'{"endpoint":<40} {"p95 ms":>18} {"change":>8} {"queries":>12}')
+    regressions = 0
+    for name, after in sorted(candidate['endpoints'].items()):
+        before = baseline['endpoints'].get(name)
+        if not before:
+            print(f'{name:<40} {"new":>18}')
+            continue
+        change = (after['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+        queries = f'{before["mean_queries"]} -> {after["mean_queries"]}'
+        flag = ''
+        if change > args.threshold or (after['mean_queries'] or 0) > (before['mean_queries'] or 0):
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f'{name:<40} {before["p95_ms"]:>8} -> {after["p95_ms"]:<8} {change:>+7.1f}% {queries:>12}{flag}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
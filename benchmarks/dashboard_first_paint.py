@@ -0,0 +1,95 @@
+"""Estimate dashboard time-to-interactive with and without the embedded payload.
+
+Generates a synthetic user, then times the requests on the dashboard's
+critical path through the Flask test client:
+
+  fetch:    GET /dashboard, then the chart's GET /api/stats/spending-by-category
+            once the page (and a render-blocking Chart.js) has loaded, which
+            is how the page used to work
+  embedded: GET /dashboard only; the chart renders from the JSON in the page
+            and Chart.js is deferred, so it downloads alongside the HTML
+
+Time to interactive is estimated as server time plus one network round trip
+(--rtt) per sequential request on the critical path. Also reports queries,
+HTML bytes and what a repeat visit downloads for the app's own static files.
+
+Usage:
+    python benchmarks/dashboard_first_paint.py [--per-user 5000] [--rtt 100] [--database-url URL]
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synthetic import generate
+
+# Sequential round trips before the chart can draw
+CRITICAL_PATH = {
+    # HTML -> blocking Chart.js in <head> -> spending API call after DOMContentLoaded
+    'fetch': (['/dashboard', '/api/stats/spending-by-category'], 3),
+    # HTML -> deferred Chart.js and dashboard.js fetched in parallel
+    'embedded': (['/dashboard'], 2),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-user', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--rtt', type=float, default=100, help='network round trip in ms')
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a scratch SQLite file')
+    return parser.parse_args()
+
+
+def timed_get(client, url):
+    started = time.perf_counter()
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    elapsed = time.perf_counter() - started
+    queries = int(re.search(r'"(\d+) queries"', response.headers['Server-Timing']).group(1))
+    return elapsed, queries, response
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + tempfile.mktemp(suffix='.db')
+
+    import app as money_tracker
+
+    with money_tracker.app.app_context():
+        money_tracker.init_db()
+    generate(money_tracker, users=1, per_user=args.per_user)
+
+    client = money_tracker.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+
+    html = client.get('/dashboard').get_data(as_text=True)
+    for name, (urls, round_trips) in CRITICAL_PATH.items():
+        timings = []
+        for _ in range(args.repeat):
+            server = queries = 0
+            for url in urls:
+                elapsed, count, _ = timed_get(client, url)
+                server += elapsed
+                queries += count
+            timings.append(server)
+        server_ms = statistics.median(timings) * 1000
+        print(f'{name:>9}: {len(urls)} request(s), {queries} queries, server {server_ms:6.2f} ms, '
+              f'estimated TTI {server_ms + round_trips * args.rtt:7.1f} ms at {args.rtt:.0f} ms RTT')
+
+    print(f'dashboard HTML: {len(html.encode()):,} bytes')
+    for url in re.findall(r'(?:href|src)="(/static/[^"]+)"', html):
+        first = client.get(url, headers={'Accept-Encoding': 'gzip'})
+        repeat = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+        print(f'{url}: {len(first.data):,} bytes gzipped ({first.headers["Cache-Control"]}), '
+              f'revalidation {repeat.status_code}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Measure peak RSS of GET /api/export as the ledger grows.
+
+For each size a scratch SQLite database is seeded in one subprocess and the
+export is streamed through the Flask test client in a fresh subprocess, so
+the reported peak RSS belongs to the export alone.
+
+Usage:
+    python benchmarks/export_memory.py [--sizes 10000,100000,1000000,5000000] [--format csv]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+def seed_database(path, rows):
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    import app as money_tracker
+    from app import db, User
+    from synthetic import seed_transactions
+
+    money_tracker.init_db()
+    with money_tracker.app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench')
+        db.session.add(user)
+        db.session.commit()
+        seed_transactions(db, money_tracker.Transaction, rows, users=1)
+
+
+def run_export(path, fmt):
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    import app as money_tracker
+
+    client = money_tracker.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+
+    started = time.perf_counter()
+    response = client.get(f'/api/export?format={fmt}', buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f'{size} {elapsed:.2f} {peak_kb}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000,5000000')
+    parser.add_argument('--format', default='csv', choices=['csv', 'ndjson', 'parquet'])
+    parser.add_argument('--seed', help=argparse.SUPPRESS)
+    parser.add_argument('--export', help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        return seed_database(args.seed, args.rows)
+    if args.export:
+        return run_export(args.export, args.format)
+
+    print(f'{"rows":>10} {"bytes":>14} {"seconds":>8} {"peak RSS MB":>12}')
+    for rows in (int(size) for size in args.sizes.split(',')):
+        path = tempfile.mktemp(suffix='.db')
+        try:
+            subprocess.run([sys.executable, __file__, '--seed', path, '--rows', str(rows)],
+                           check=True, stdout=subprocess.DEVNULL)
+            output = subprocess.run(
+                [sys.executable, __file__, '--export', path, '--format', args.format],
+                check=True, capture_output=True, text=True
+            ).stdout.split()
+            size, elapsed, peak_kb = output[-3:]
+            print(f'{rows:>10,} {int(size):>14,} {float(elapsed):>8.2f} {int(peak_kb) / 1024:>12.1f}')
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""Concurrent load scenario that replays the dashboard, transactions and budgets page flows.
+
+Each virtual user logs in as one of the synthetic users (see synthetic.py)
+and repeatedly picks a flow, issuing the same requests the browser pages
+make. Per-request latency percentiles, error counts and SQL statement counts
+(read from the Server-Timing header) are written as JSON so runs can be
+compared across commits and databases.
+
+Usage:
+    python benchmarks/synthetic.py --database-url sqlite:///bench.db --users 20
+    DATABASE_URL=sqlite:///bench.db gunicorn -c gunicorn.conf.py wsgi:app
+    python benchmarks/load_test.py --host http://localhost:5000 --users 20 --duration 60 \\
+        --output results/load-$(git rev-parse --short HEAD).json
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from synthetic import PASSWORD
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class VirtualUser:
+    def __init__(self, host, username, results, rng):
+        self.host = host.rstrip('/')
+        self.username = username
+        self.results = results
+        self.rng = rng
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def request(self, name, path, method='GET', body=None):
+        data = None
+        headers = {}
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.host + path, data=data, method=method, headers=headers)
+
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=30) as response:
+                payload = response.read()
+                status = response.status
+                timing = response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as e:
+            payload, status, timing = b'', e.code, ''
+        except OSError:
+            payload, status, timing = b'', 0, ''
+        elapsed = time.perf_counter() - started
+
+        match = SERVER_TIMING_QUERIES.search(timing)
+        self.results.record(name, elapsed, status, int(match.group(1)) if match else None)
+        return payload
+
+    def login(self):
+        form = urllib.parse.urlencode({'username': self.username, 'password': PASSWORD}).encode()
+        req = urllib.request.Request(self.host + '/login', data=form, method='POST')
+        self.opener.open(req, timeout=30).read()
+
+    def dashboard_flow(self):
+        self.request('GET /dashboard', '/dashboard')
+        self.request('GET /api/stats/spending-by-category', '/api/stats/spending-by-category')
+
+    def transactions_flow(self):
+        self.request('GET /transactions', '/transactions')
+        self.request('GET /api/categories', '/api/categories')
+        page = json.loads(self.request('GET /api/transactions', '/api/transactions') or b'{}')
+        if page.get('next_cursor') and self.rng.random() < 0.5:
+            cursor = urllib.parse.quote(page['next_cursor'])
+            self.request('GET /api/transactions?cursor', f'/api/transactions?cursor={cursor}')
+        if self.rng.random() < 0.2:
+            self.request('POST /api/transactions', '/api/transactions', method='POST', body={
+                'category_id': self.rng.randint(4, 10),
+                'amount': round(self.rng.uniform(1, 100), 2),
+                'description': 'load test',
+                'date': date.today().isoformat(),
+            })
+
+    def budgets_flow(self):
+        self.request('GET /budgets', '/budgets')
+        self.request('GET /api/categories', '/api/categories')
+        self.request('GET /api/budgets', '/api/budgets')
+
+    def run(self, deadline, think_time):
+        self.login()
+        flows = [self.dashboard_flow, self.transactions_flow, self.budgets_flow]
+        while time.monotonic() < deadline:
+            self.rng.choices(flows, weights=[5, 3, 2])[0]()
+            time.sleep(self.rng.uniform(0, think_time))
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.queries = defaultdict(list)
+
+    def record(self, name, elapsed, status, queries):
+        with self.lock:
+            self.samples[name].append(elapsed)
+            if status == 0 or status >= 400:
+                self.errors[name] += 1
+            if queries is not None:
+                self.queries[name].append(queries)
+
+    def summary(self, duration):
+        def percentile(ordered, q):
+            return ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+
+        report = {}
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            queries = self.queries.get(name)
+            report[name] = {
+                'requests': len(ordered),
+                'errors': self.errors.get(name, 0),
+                'rps': round(len(ordered) / duration, 2),
+                'p50_ms': round(percentile(ordered, 0.5), 2),
+                'p95_ms': round(percentile(ordered, 0.95), 2),
+                'p99_ms': round(percentile(ordered, 0.99), 2),
+                'mean_queries': round(sum(queries) / len(queries), 2) if queries else None,
+            }
+        return report
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='http://localhost:5000')
+    parser.add_argument('--users', type=int, default=10, help='concurrent virtual users')
+    parser.add_argument('--first-user', type=int, default=1, help='first synthetic user number')
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    parser.add_argument('--think-time', type=float, default=0.5, help='max pause between flows')
+    parser.add_argument('--database', default=None, help='label recorded in the results, e.g. sqlite')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=None, help='write JSON results to this file')
+    args = parser.parse_args()
+
+    results = Results()
+    deadline = time.monotonic() + args.duration
+    workers = [
+        threading.Thread(target=VirtualUser(
+            args.host, f'bench{args.first_user + i}', results, random.Random(args.seed + i)
+        ).run, args=(deadline, args.think_time))
+        for i in range(args.users)
+    ]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    report = {
+        'revision': git_revision(),
+        'database': args.database,
+        'users': args.users,
+        'duration_s': round(time.monotonic() - started, 1),
+        'endpoints': results.summary(args.duration),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
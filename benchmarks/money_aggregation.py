@@ -0,0 +1,100 @@
+"""Compare aggregate speed and accuracy of float vs integer-cents amounts.
+
+Seeds the same ROWS random amounts (default 1,000,000) into two scratch
+tables: one with a REAL/DOUBLE `amount` column as the app used to store,
+one with a BIGINT `amount_cents` column as it stores now. Runs the grouped
+SUM the stats endpoints rely on against each, printing the best-of-N wall
+time and how far each total drifts from the exact Decimal sum.
+
+Usage:
+    python benchmarks/money_aggregation.py [--rows 1000000] [--database-url URL]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+
+import sqlalchemy as sa
+
+BATCH_SIZE = 10_000
+GROUPS = 50
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a scratch SQLite file')
+    return parser.parse_args()
+
+
+def seed(engine, float_table, cents_table, rows, rng):
+    """Insert identical amounts into both tables; returns exact totals per group"""
+    exact = {}
+    with engine.begin() as conn:
+        for offset in range(0, rows, BATCH_SIZE):
+            batch = []
+            for _ in range(min(BATCH_SIZE, rows - offset)):
+                group = rng.randrange(GROUPS)
+                cents = rng.randint(1, 50000)
+                exact[group] = exact.get(group, 0) + cents
+                batch.append((group, cents))
+            conn.execute(float_table.insert(), [{'grp': g, 'amount': c / 100} for g, c in batch])
+            conn.execute(cents_table.insert(), [{'grp': g, 'amount_cents': c} for g, c in batch])
+    return exact
+
+
+def best_time(engine, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            rows = conn.execute(query).all()
+        timings.append(time.perf_counter() - started)
+    return min(timings), rows
+
+
+def main():
+    args = parse_args()
+    url = args.database_url or 'sqlite:///' + tempfile.mktemp(suffix='.db')
+    engine = sa.create_engine(url)
+    metadata = sa.MetaData()
+    float_table = sa.Table('bench_amount_float', metadata,
+                           sa.Column('grp', sa.Integer, index=True),
+                           sa.Column('amount', sa.Float, nullable=False))
+    cents_table = sa.Table('bench_amount_cents', metadata,
+                           sa.Column('grp', sa.Integer, index=True),
+                           sa.Column('amount_cents', sa.BigInteger, nullable=False))
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    try:
+        print(f'Seeding {args.rows:,} amounts into {engine.dialect.name}...')
+        exact = seed(engine, float_table, cents_table, args.rows, random.Random(args.seed))
+
+        variants = {
+            'float': (sa.select(float_table.c.grp, sa.func.sum(float_table.c.amount))
+                      .group_by(float_table.c.grp),
+                      lambda total: Decimal(repr(float(total)))),
+            'cents': (sa.select(cents_table.c.grp, sa.func.sum(cents_table.c.amount_cents))
+                      .group_by(cents_table.c.grp),
+                      lambda total: Decimal(int(total)).scaleb(-2)),
+        }
+        for name, (query, to_decimal) in variants.items():
+            elapsed, rows = best_time(engine, query, args.repeat)
+            drift = [abs(to_decimal(total) - Decimal(exact[group]).scaleb(-2)) for group, total in rows]
+            wrong = sum(1 for d in drift if d)
+            print(f'{name:>6}: {elapsed * 1000:8.1f} ms  '
+                  f'groups off by any amount: {wrong}/{len(rows)}  max drift: {max(drift)}')
+    finally:
+        metadata.drop_all(engine)
+        if args.database_url is None:
+            os.unlink(engine.url.database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Compare query plans and timings for month filtering on a seeded ledger.
+
+Seeds ROWS transactions (default 1,000,000) into a scratch database and runs
+the monthly spending query twice: with the old EXTRACT(month/year) predicate
+and with the half-open date range used by the app, printing the plan and the
+best-of-N wall time for each.
+
+Usage:
+    python benchmarks/query_plans.py [--rows 1000000] [--database-url URL]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synthetic import seed_transactions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a scratch SQLite file')
+    return parser.parse_args()
+
+
+def explain(db, query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if db.engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    with db.engine.connect() as conn:
+        return [' '.join(str(col) for col in row) for row in conn.exec_driver_sql(prefix + sql)]
+
+
+def best_time(query, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        query.all()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + tempfile.mktemp(suffix='.db')
+
+    import app as money_tracker
+    from app import db, Category, Transaction, in_month
+
+    with money_tracker.app.app_context():
+        money_tracker.init_db()
+        if Transaction.query.count() < args.rows:
+            print(f'Seeding {args.rows:,} transactions...')
+            seed_transactions(db, Transaction, args.rows, args.users)
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql('ANALYZE')
+
+        user_id, year, month = 1, 2023, 6
+        base = db.session.query(
+            Category.name, db.func.sum(Transaction.amount_cents)
+        ).join(Transaction).filter(
+            Transaction.user_id == user_id,
+            Category.type == 'expense',
+        ).group_by(Category.id)
+
+        variants = {
+            'extract': base.filter(
+                db.extract('month', Transaction.date) == month,
+                db.extract('year', Transaction.date) == year,
+            ),
+            'date range': base.filter(in_month(Transaction.date, year, month)),
+        }
+        for label, query in variants.items():
+            print(f'\n== {label} ==')
+            for line in explain(db, query):
+                print('  ' + line)
+            print(f'  best of {args.repeat}: {best_time(query, args.repeat) * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Time a large CSV import categorized by per-user rules.
+
+Creates RULES contains/regex rules for one user, then imports ROWS
+uncategorized CSV rows (default 100,000) through /api/transactions/bulk,
+once with no rules and once with the rules in place, and reports rows per
+second and how many rows each rule set categorized.
+
+Usage:
+    python benchmarks/rules_import.py [--rows 100000] [--rules 50] [--database-url URL]
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synthetic import DESCRIPTIONS, PASSWORD
+
+MERCHANTS = ['STARBUCKS', 'AMZN MKTP', 'SHELL OIL', 'UBER TRIP', 'NETFLIX.COM', 'WALGREENS', 'TARGET']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--rules', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a scratch SQLite file')
+    return parser.parse_args()
+
+
+def csv_body(rng, rows, offset):
+    words = [w for names in DESCRIPTIONS.values() for w in names] + MERCHANTS
+    lines = ['date,amount,description']
+    # Statement order: dates ascend, about 50 rows a day
+    start = date(2020, 1, 1) + timedelta(days=offset // 50)
+    for i in range(rows):
+        day = start + timedelta(days=i // 50)
+        # The row number keeps descriptions unique so nothing is skipped as a duplicate
+        lines.append(f'{day.isoformat()},{rng.randint(100, 50000) / 100},{rng.choice(words)} #{offset + i}')
+    return '\n'.join(lines).encode()
+
+
+def import_rows(client, body):
+    started = time.perf_counter()
+    response = client.post('/api/transactions/bulk', data=body, content_type='text/csv')
+    elapsed = time.perf_counter() - started
+    return elapsed, response.get_json()
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + tempfile.mktemp(suffix='.db')
+
+    import app as money_tracker
+
+    money_tracker.init_db()
+    rng = random.Random(args.seed)
+    client = money_tracker.app.test_client()
+    client.post('/register', data={'username': 'rules', 'email': 'rules@example.com', 'password': PASSWORD})
+    client.post('/login', data={'username': 'rules', 'password': PASSWORD})
+
+    elapsed, result = import_rows(client, csv_body(rng, args.rows, 0))
+    print(f'   no rules: {args.rows / elapsed:10,.0f} rows/s  imported {result["imported"]:,}')
+
+    with money_tracker.app.app_context():
+        expense_ids = [c.id for c in money_tracker.category_cache.all()
+                       if c.type == 'expense' and c.name != money_tracker.UNCATEGORIZED]
+    words = [w for names in DESCRIPTIONS.values() for w in names] + MERCHANTS
+    for i in range(args.rules):
+        word = words[i % len(words)]
+        rule = {'category_id': rng.choice(expense_ids), 'pattern': word, 'merchant': word.title()}
+        if i % 3 == 0:
+            rule.update(match_type='regex', pattern=rf'\b{word.split()[0]}\b')
+        if i % 5 == 0:
+            rule['min_amount'] = 50
+        client.post('/api/rules', json=rule)
+
+    elapsed, result = import_rows(client, csv_body(rng, args.rows, args.rows))
+    with money_tracker.app.app_context():
+        uncategorized = money_tracker.uncategorized_category().id
+        categorized = money_tracker.Transaction.query.filter(
+            money_tracker.Transaction.id > args.rows,
+            money_tracker.Transaction.category_id != uncategorized
+        ).count()
+    print(f'{args.rules:>3} rules: {args.rows / elapsed:10,.0f} rows/s  imported {result["imported"]:,}, '
+          f'categorized {categorized:,}')
+
+
+if __name__ == '__main__':
+    main()
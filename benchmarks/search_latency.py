@@ -0,0 +1,65 @@
+"""Measure /api/transactions/search latency on a large synthetic ledger.
+
+Generates USERS x PER_USER transactions (default 1,000,000) with the
+synthetic generator, so the full-text index is filled through the same
+triggers/generated column the app relies on, then times a mix of common,
+rare, prefix and multi-word queries through the Flask test client.
+
+Usage:
+    python benchmarks/search_latency.py [--users 200] [--per-user 5000] [--database-url URL]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synthetic import generate
+
+QUERIES = ['coffee', 'train ticket', 'dent', 'groceries', 'e', 'salary', 'nomatch']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--per-user', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--database-url', default=None,
+                        help='defaults to a scratch SQLite file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    os.environ['DATABASE_URL'] = args.database_url or 'sqlite:///' + tempfile.mktemp(suffix='.db')
+
+    import app as money_tracker
+
+    with money_tracker.app.app_context():
+        money_tracker.init_db()
+    print(f'Generating {args.users * args.per_user:,} transactions...')
+    started = time.perf_counter()
+    generate(money_tracker, users=args.users, per_user=args.per_user)
+    print(f'  done in {time.perf_counter() - started:.1f}s')
+
+    client = money_tracker.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            response = client.get('/api/transactions/search', query_string={'q': query})
+            timings.append(time.perf_counter() - started)
+        page = response.get_json()
+        results = len(page.get('transactions', [])) if response.status_code == 200 else response.status_code
+        print(f'{query!r:>16}: p50 {statistics.median(timings) * 1000:7.2f} ms  '
+              f'max {max(timings) * 1000:7.2f} ms  page rows {results}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""Compare concurrent write throughput on one database against user-id shards.
+
+Generates USERS synthetic users, then has THREADS workers (one user each,
+round-robin) POST single transactions through the Flask test client for
+--seconds. With --shards 0 everything lives in DATABASE_URL; with
+--shards N each user's rows live in one of N scratch SQLite files, so
+writers for different users stop queueing on the same database lock.
+Reports writes per second and how users spread across the shards.
+
+Usage:
+    python benchmarks/shard_writes.py [--shards 4] [--users 16] [--threads 8] [--seconds 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from synthetic import generate
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shards', type=int, default=4, help='0 disables sharding')
+    parser.add_argument('--users', type=int, default=16)
+    parser.add_argument('--per-user', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    return parser.parse_args()
+
+
+def writer(money_tracker, user_id, deadline, latencies):
+    client = money_tracker.app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+    body = {'category_id': 4, 'amount': 12.5, 'date': date.today().isoformat(),
+            'description': 'Benchmark write'}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = client.post('/api/transactions', json=body)
+        if response.status_code == 201:
+            latencies.append(time.perf_counter() - started)
+
+
+def main():
+    args = parse_args()
+    scratch = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f'sqlite:///{scratch}/main.db'
+    os.environ['DATABASE_SHARD_URLS'] = ','.join(
+        f'sqlite:///{scratch}/shard{i}.db' for i in range(args.shards))
+
+    import app as money_tracker
+
+    money_tracker.init_db()
+    generate(money_tracker, users=args.users, per_user=args.per_user)
+
+    router = money_tracker.database_router
+    spread = Counter(router.shard_for_user(user_id) for user_id in range(1, args.users + 1))
+    print('users per shard:', dict(sorted(spread.items(), key=lambda item: str(item[0]))))
+
+    latencies = []
+    deadline = time.perf_counter() + args.seconds
+    threads = [threading.Thread(target=writer,
+                                args=(money_tracker, i % args.users + 1, deadline, latencies))
+               for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f'{args.shards} shard(s), {args.threads} threads: {len(latencies) / args.seconds:8,.0f} writes/s  '
+          f'p50 {statistics.median(latencies) * 1000:6.2f} ms  '
+          f'p99 {statistics.quantiles(latencies, n=100)[98] * 1000:6.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
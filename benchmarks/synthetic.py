@@ -0,0 +1,177 @@
+"""Seeded synthetic data generator for benchmarks.
+
+Creates users with a few years of plausible history: a monthly salary,
+occasional freelance/investment income, expenses spread across categories
+with skewed amounts, and monthly budgets for the expense categories. The
+same seed always produces the same data.
+
+Usage:
+    python benchmarks/synthetic.py --database-url sqlite:///bench.db --users 50 --per-user 5000
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+BATCH_SIZE = 10_000
+PASSWORD = 'benchmark'
+
+# Relative frequency and typical amount per expense category
+EXPENSE_PROFILE = {
+    'Food & Dining': (40, 25),
+    'Transportation': (20, 15),
+    'Shopping': (15, 60),
+    'Entertainment': (10, 40),
+    'Utilities': (5, 120),
+    'Healthcare': (5, 80),
+    'Education': (5, 150),
+}
+DESCRIPTIONS = {
+    'Food & Dining': ['Coffee', 'Groceries', 'Lunch', 'Dinner out', 'Bakery'],
+    'Transportation': ['Bus pass', 'Fuel', 'Taxi', 'Parking', 'Train ticket'],
+    'Shopping': ['Clothes', 'Electronics', 'Books', 'Home goods'],
+    'Entertainment': ['Cinema', 'Concert', 'Streaming', 'Games'],
+    'Utilities': ['Electricity', 'Water', 'Internet', 'Phone'],
+    'Healthcare': ['Pharmacy', 'Dentist', 'Doctor'],
+    'Education': ['Course', 'Textbooks', 'Workshop'],
+}
+
+
+def batched_insert(db, table, rows, engine=None):
+    """Insert an iterable of row dicts with executemany in fixed-size batches"""
+    batch = []
+    with (engine or db.engine).begin() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                conn.execute(table.insert(), batch)
+                batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+
+
+def seed_transactions(db, Transaction, rows, users, seed=42, start=date(2020, 1, 1), days=6 * 365):
+    """Fast uniform seeding for plan/memory benchmarks that only need volume"""
+    rng = random.Random(seed)
+
+    def generate():
+        for _ in range(rows):
+            yield {
+                'user_id': rng.randint(1, users),
+                'category_id': rng.randint(1, 10),
+                'amount_cents': rng.randint(100, 50000),
+                'description': 'seed',
+                'date': start + timedelta(days=rng.randrange(days)),
+            }
+
+    batched_insert(db, Transaction.__table__, generate())
+
+
+def user_history(rng, user_id, categories, per_user, start, end):
+    """Yield one user's transactions in date order"""
+    span = (end - start).days
+    months = max(span // 30, 1)
+    expense_names = list(EXPENSE_PROFILE)
+    weights = [EXPENSE_PROFILE[name][0] for name in expense_names]
+
+    # Income: salary on the 1st of each month plus occasional side income
+    month = start.replace(day=1)
+    salary = rng.randint(250000, 700000)
+    while month < end:
+        yield {'user_id': user_id, 'category_id': categories['Salary'], 'amount_cents': salary,
+               'description': 'Monthly salary', 'date': month}
+        if rng.random() < 0.3:
+            name = rng.choice(['Freelance', 'Investment'])
+            yield {'user_id': user_id, 'category_id': categories[name],
+                   'amount_cents': rng.randint(10000, 150000), 'description': name,
+                   'date': month + timedelta(days=rng.randrange(28))}
+        month = (month + timedelta(days=32)).replace(day=1)
+
+    for _ in range(max(per_user - months, 0)):
+        name = rng.choices(expense_names, weights)[0]
+        typical = EXPENSE_PROFILE[name][1]
+        yield {'user_id': user_id, 'category_id': categories[name],
+               'amount_cents': max(round(rng.lognormvariate(0, 0.6) * typical * 100), 1),
+               'description': rng.choice(DESCRIPTIONS[name]),
+               'date': start + timedelta(days=rng.randrange(span))}
+
+
+def generate(money_tracker, users=10, per_user=1000, years=3, seed=42):
+    """Populate the app database with synthetic users, transactions and budgets.
+
+    With DATABASE_SHARD_URLS set, each user's rows go to their shard.
+    Returns the generated usernames; every user's password is PASSWORD.
+    """
+    from werkzeug.security import generate_password_hash
+
+    db = money_tracker.db
+    rng = random.Random(seed)
+    end = date.today()
+    start = end - timedelta(days=365 * years)
+
+    with money_tracker.app.app_context():
+        categories = {c.name: c.id for c in money_tracker.Category.query.all()}
+        first_id = (db.session.query(db.func.max(money_tracker.User.id)).scalar() or 0) + 1
+        # Hash once; every synthetic user shares the same password
+        password_hash = generate_password_hash(PASSWORD)
+        usernames = [f'bench{first_id + i}' for i in range(users)]
+        user_rows = [
+            {'id': first_id + i, 'username': name, 'email': f'{name}@example.com',
+             'password_hash': password_hash}
+            for i, name in enumerate(usernames)
+        ]
+        batched_insert(db, money_tracker.User.__table__, user_rows)
+
+        router = money_tracker.database_router
+        by_shard = {}
+        for user in user_rows:
+            by_shard.setdefault(router.shard_for_user(user['id']), []).append(user)
+
+        for shard, shard_users in by_shard.items():
+            with money_tracker.using_shard(shard):
+                engine = money_tracker.primary_engine()
+                if shard is not None:
+                    # Identity rows on the shard, as registration creates them
+                    batched_insert(db, money_tracker.User.__table__,
+                                   (dict(user, password_hash='') for user in shard_users), engine)
+                for user in shard_users:
+                    batched_insert(db, money_tracker.Transaction.__table__,
+                                   user_history(rng, user['id'], categories, per_user, start, end), engine)
+
+                budgets = []
+                month = start.replace(day=1)
+                while month <= end:
+                    for user in shard_users:
+                        for name, (_, typical) in EXPENSE_PROFILE.items():
+                            budgets.append({'user_id': user['id'], 'category_id': categories[name],
+                                            'amount_cents': round(typical * rng.uniform(3, 12) * 100),
+                                            'month': month.month, 'year': month.year})
+                    month = (month + timedelta(days=32)).replace(day=1)
+                batched_insert(db, money_tracker.Budget.__table__, budgets, engine)
+
+                money_tracker.rebuild_rollups()
+    return usernames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', required=True)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--per-user', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url
+    import app as money_tracker
+
+    money_tracker.init_db()
+    usernames = generate(money_tracker, args.users, args.per_user, args.years, args.seed)
+    print(f'Created {len(usernames)} users ({usernames[0]}..{usernames[-1]}), password "{PASSWORD}"')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,16 @@
+"""Shared fixtures: the app module imported against a scratch SQLite database."""
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def money_tracker(tmp_path_factory):
+    # DATABASE_URL is read at import time, so app must not be imported before this runs
+    os.environ['DATABASE_URL'] = 'sqlite:///' + str(tmp_path_factory.mktemp('db') / 'money_tracker.db')
+    import app
+    app.init_db()
+    yield app
+    with app.app.app_context():
+        for engine in app.db.engines.values():
+            engine.dispose()
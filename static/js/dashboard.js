@@ -0,0 +1,54 @@
+// Dashboard chart, rendered from the JSON payload embedded in the page so
+// first paint needs no API round trips.
+let spendingChart = null;
+
+function dashboardData() {
+    return JSON.parse(document.getElementById('dashboard-data').textContent);
+}
+
+function renderSpendingChart() {
+    const data = dashboardData().spending_by_category;
+    const canvas = document.getElementById('spendingChart');
+    const noData = document.getElementById('noDataMessage');
+
+    if (data.length === 0 || typeof Chart === 'undefined') {
+        canvas.style.display = 'none';
+        noData.classList.remove('d-none');
+        return;
+    }
+
+    canvas.style.display = 'block';
+    noData.classList.add('d-none');
+
+    if (spendingChart) {
+        spendingChart.destroy();
+    }
+    spendingChart = new Chart(canvas.getContext('2d'), {
+        type: 'doughnut',
+        data: {
+            labels: data.map(item => item.category),
+            datasets: [{
+                data: data.map(item => item.amount),
+                backgroundColor: data.map(item => item.color),
+                borderWidth: 2,
+                borderColor: '#fff'
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: true,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        usePointStyle: true,
+                        padding: 15
+                    }
+                }
+            }
+        }
+    });
+}
+
+// Deferred scripts run after the document is parsed, so the payload is in place
+renderSpendingChart();
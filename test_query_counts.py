@@ -0,0 +1,90 @@
+"""SQL statements per request must not grow with the number of rows returned.
+
+Seeds one user with N transactions and budgets and another with 10N, then
+checks the listing and detail endpoints issue the same number of statements
+for both.
+"""
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+ROWS = 30
+USERS = {1: ROWS, 2: 10 * ROWS}
+
+
+def seed(money_tracker, user_id, rows, categories):
+    db = money_tracker.db
+    start = date(2020, 1, 1)
+    db.session.execute(money_tracker.User.__table__.insert().values(
+        id=user_id, username=f'user{user_id}', email=f'user{user_id}@example.com', password_hash=''))
+    db.session.execute(money_tracker.Transaction.__table__.insert(), [
+        {'user_id': user_id, 'category_id': categories[i % len(categories)], 'amount_cents': 100 + i,
+         'description': f'row {i}', 'date': start + timedelta(days=i)}
+        for i in range(rows)
+    ])
+    db.session.execute(money_tracker.Budget.__table__.insert(), [
+        {'user_id': user_id, 'category_id': categories[i % len(categories)], 'amount_cents': 10000,
+         'month': i // len(categories) % 12 + 1, 'year': 2000 + i // (12 * len(categories))}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+@pytest.fixture(scope='module')
+def clients(money_tracker):
+    # Time-based re-checks would otherwise land in one measurement but not the other
+    money_tracker.category_cache.check_interval = float('inf')
+    money_tracker.app.config['USER_CACHE_SECONDS'] = 3600
+    with money_tracker.app.app_context():
+        categories = [c.id for c in money_tracker.Category.query.order_by(money_tracker.Category.id)]
+        for user_id, rows in USERS.items():
+            seed(money_tracker, user_id, rows, categories)
+    clients = {}
+    for user_id in USERS:
+        client = money_tracker.app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+        clients[user_id] = client
+    return clients
+
+
+def statement_count(money_tracker, client, url):
+    counts = [0]
+    # The test client runs the request on this thread; background job polling does not
+    request_thread = threading.get_ident()
+
+    def count(*args, **kwargs):
+        if threading.get_ident() == request_thread:
+            counts[0] += 1
+
+    with money_tracker.app.app_context():
+        engine = money_tracker.db.engine
+    # Warm per-process caches (user, categories) so both users are measured alike
+    assert client.get(url).status_code == 200
+    money_tracker.db.event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = client.get(url)
+    finally:
+        money_tracker.db.event.remove(engine, 'before_cursor_execute', count)
+    assert response.status_code == 200
+    return counts[0], response
+
+
+@pytest.mark.parametrize('url', ['/api/transactions?limit=1000', '/api/budgets'])
+def test_listing_query_count_is_constant(money_tracker, clients, url):
+    small, small_response = statement_count(money_tracker, clients[1], url)
+    large, large_response = statement_count(money_tracker, clients[2], url)
+    assert len(large_response.data) > len(small_response.data)
+    assert small == large
+
+
+def test_detail_query_count_is_constant(money_tracker, clients):
+    Transaction = money_tracker.Transaction
+    with money_tracker.app.app_context():
+        ids = {user_id: money_tracker.db.session.query(money_tracker.db.func.max(Transaction.id))
+               .filter(Transaction.user_id == user_id).scalar()
+               for user_id in USERS}
+    small, _ = statement_count(money_tracker, clients[1], f'/api/transactions/{ids[1]}')
+    large, _ = statement_count(money_tracker, clients[2], f'/api/transactions/{ids[2]}')
+    assert small == large
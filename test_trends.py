@@ -0,0 +1,32 @@
+"""Trend series must end at today's month whatever dates the history spans."""
+from datetime import date
+
+import numpy as np
+
+TODAY = date(2024, 6, 15)
+CURRENT_MONTH = TODAY.year * 12 + TODAY.month - 1
+
+
+def test_future_dated_month_is_clipped(money_tracker):
+    # April, May, June (current) and a future-dated July row
+    matrix = np.array([[1000, 2000, 3000, 99900]], dtype=np.int64)
+    trends = money_tracker.compute_trends(np.array([7]), CURRENT_MONTH - 2, matrix, TODAY)
+    assert trends['first_month'] == CURRENT_MONTH - 2
+    assert trends['totals'].tolist() == [[10.0, 20.0, 30.0]]
+    assert trends['month_to_date'].tolist() == [30.0]
+
+
+def test_history_is_padded_to_current_month(money_tracker):
+    matrix = np.array([[1000, 2000]], dtype=np.int64)
+    trends = money_tracker.compute_trends(np.array([7]), CURRENT_MONTH - 4, matrix, TODAY)
+    assert trends['first_month'] == CURRENT_MONTH - 4
+    assert trends['totals'].shape == (1, 5)
+    assert trends['month_to_date'].tolist() == [0.0]
+
+
+def test_only_future_history(money_tracker):
+    matrix = np.array([[1000]], dtype=np.int64)
+    trends = money_tracker.compute_trends(np.array([7]), CURRENT_MONTH + 1, matrix, TODAY)
+    assert trends['first_month'] == CURRENT_MONTH
+    assert trends['totals'].tolist() == [[0.0]]
+    assert trends['month_to_date'].tolist() == [0.0]
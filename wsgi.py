@@ -0,0 +1,10 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Run `flask --app app init-db` once before starting workers; the app does not
+create tables on import so that scaled-out workers never race on create_all.
+"""
+from app import app
+
+application = app